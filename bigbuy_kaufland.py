@@ -1,10 +1,40 @@
 import requests
 import json
-import csv
 import os
 import random
 from datetime import datetime
 import time
+from feed_ratelimit import AdaptiveRateLimiter
+from feed_checkpoint import FetchCheckpoint
+from feed_pipeline import Pipeline
+from feed_output import FeedCsvWriter
+from feed_changes import RowIndex
+from feed_validator import check_feed
+from feed_text import load_description_cache, truncate_description, drain_description_cache
+from feed_spill import SpillBuffer
+from feed_shards import sharded_output_from_env
+from feed_images import image_verifier_from_env
+from feed_budget import RunBudget
+from feed_workers import split_batch_by_sku, new_worker_pool, merge_shard_result
+from feed_content_filter import is_adult_taxonomy, adult_content_match
+from feed_rules import MARKETPLACE_RULES, REASON_ATTRIBUTES, compile_rules
+from feed_taxonomy import load_taxonomy_tree
+from feed_ledger import RejectionLedger
+from feed_history import record_run
+from feed_variations import variation_names_from_env, product_offers, variation_title
+from feed_json import decode_response, decode_stats
+from feed_scoring import load_score_config, offer_score, TopK
+from feed_quotas import (load_taxonomy_yield, compute_taxonomy_quotas, new_yield_counters,
+                         merge_taxonomy_yield, yield_report)
+
+FEED_FIELDNAMES = [
+    'id_offer', 'ean', 'locale', 'category', 'title', 'short_description', 'description',
+    'manufacturer', 'picture_1', 'picture_2', 'picture_3', 'picture_4', 'price_cs',
+    'quantity', 'condition', 'length', 'width', 'height', 'weight', 'content_volume',
+    'currency', 'handling_time', 'delivery_time_max', 'delivery_time_min'
+]
+# Image columns, in display order (dead URLs are dropped and the rest move up)
+IMAGE_FIELDS = ('picture_1', 'picture_2', 'picture_3', 'picture_4')
 
 class BigBuyAPI:
     def __init__(self, api_key: str):
@@ -14,16 +44,31 @@ class BigBuyAPI:
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
         }
+        # Keep-alive connections across requests (and across builds in the daemon)
+        self.session = requests.Session()
+        self.rate_limiter = AdaptiveRateLimiter()
+        self.max_retries = 5
+
+    def _make_request(self, endpoint: str, projection=None):
+        """Make API request with cache busting, adaptive rate limiting and 429 retries
 
-    def _make_request(self, endpoint: str):
-        """Make API request with cache busting"""
+        The body is decoded with feed_json, keeping only the fields of projection.
+        """
         separator = '&' if '?' in endpoint else '?'
-        cache_buster = f"{separator}t={int(time.time())}"
-        url = f"{self.base_url}{endpoint}{cache_buster}"
         
         try:
-            response = requests.get(url, headers=self.headers)
-            print(f"Request: {endpoint} - Status: {response.status_code}")
+            for attempt in range(self.max_retries + 1):
+                self.rate_limiter.acquire()
+                cache_buster = f"{separator}t={int(time.time())}"
+                url = f"{self.base_url}{endpoint}{cache_buster}"
+                response = self.session.get(url, headers=self.headers)
+                print(f"Request: {endpoint} - Status: {response.status_code}")
+                
+                retry_after = self.rate_limiter.on_response(response.status_code, response.headers)
+                if response.status_code != 429:
+                    break
+                if attempt < self.max_retries:
+                    print(f"⏳ Rate limited, retrying in {retry_after:.1f}s (rate now {self.rate_limiter.rate:.2f} req/s)")
             
             if response.status_code == 401:
                 print("❌ Authentication Error")
@@ -33,22 +78,22 @@ class BigBuyAPI:
                 return None
             
             response.raise_for_status()
-            return response.json()
+            return decode_response(response.content, projection)
             
         except Exception as e:
             print(f"❌ Error: {e}")
             return None
 
-    def get_taxonomies(self, limit=None):
-        """Get product categories with optional limit"""
-        result = self._make_request("/rest/catalog/taxonomies.json?firstLevel")
+    def get_taxonomies(self, limit=None, tree=None):
+        """Get product categories with optional limit (subcategories of the cached tree when given)"""
+        result = tree.leaves() if tree else self._make_request("/rest/catalog/taxonomies.json?firstLevel")
         if result:
-            # Filter out erotic categories
+            # Filter out erotic categories (subcategories by their department: the
+            # substring keywords would also catch leaf names like "Unisex")
             filtered = []
-            erotic_keywords = ['erotic', 'erotico', 'adult', 'sex', 'sexy', 'intimate', 'lingerie', 'sensualidad']
             for taxonomy in result:
-                name = taxonomy.get('name', '').lower()
-                if not any(keyword in name for keyword in erotic_keywords):
+                name = tree.department(taxonomy) if tree else taxonomy.get('name', '')
+                if not is_adult_taxonomy(name):
                     filtered.append(taxonomy)
                 else:
                     print(f"🚫 Filtered: {taxonomy['name']}")
@@ -62,29 +107,41 @@ class BigBuyAPI:
             return filtered
         return []
 
+    def get_all_taxonomies(self):
+        """Get the full taxonomy tree (every level, with parentTaxonomy)"""
+        return self._make_request("/rest/catalog/taxonomies.json", 'taxonomies') or []
+
     def get_products(self, taxonomy_id):
         """Get products for category"""
-        return self._make_request(f"/rest/catalog/products.json?parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/products.json?parentTaxonomy={taxonomy_id}", 'products')
 
     def get_product_variations(self, taxonomy_id):
         """Get product variations for category"""
-        return self._make_request(f"/rest/catalog/productsvariations.json?parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/productsvariations.json?parentTaxonomy={taxonomy_id}", 'variations')
 
     def get_product_stock(self, taxonomy_id):
         """Get actual stock data by taxonomy"""
-        return self._make_request(f"/rest/catalog/productsstockbyhandlingdays.json?parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/productsstockbyhandlingdays.json?parentTaxonomy={taxonomy_id}", 'stock')
 
     def get_variations_stock(self, taxonomy_id):
         """Get variation stock data"""
-        return self._make_request(f"/rest/catalog/productsvariationsstockbyhandlingdays.json?parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/productsvariationsstockbyhandlingdays.json?parentTaxonomy={taxonomy_id}", 'variations_stock')
 
     def get_product_info(self, taxonomy_id, language="it"):
         """Get product descriptions in specified language"""
-        return self._make_request(f"/rest/catalog/productsinformation.json?isoCode={language}&parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/productsinformation.json?isoCode={language}&parentTaxonomy={taxonomy_id}", 'info')
 
     def get_product_images(self, taxonomy_id):
         """Get product images"""
-        return self._make_request(f"/rest/catalog/productsimages.json?parentTaxonomy={taxonomy_id}")
+        return self._make_request(f"/rest/catalog/productsimages.json?parentTaxonomy={taxonomy_id}", 'images')
+
+    def get_attributes(self, language="it"):
+        """Get localized variation attribute names"""
+        return self._make_request(f"/rest/catalog/attributes.json?isoCode={language}", 'attributes')
+
+    def get_attribute_groups(self, language="it"):
+        """Get localized attribute group names (size, colour...)"""
+        return self._make_request(f"/rest/catalog/attributegroups.json?isoCode={language}", 'attribute_groups')
 
 def safe_float(value, default=0.0):
     """Safely convert to float"""
@@ -165,21 +222,23 @@ def validate_product_data(product, info, variations, stock_data):
     product_id = product.get('id')
     sku = product.get('sku')
     
-    # Look for stock in direct stock data
-    direct_stock = stock_data.get('products', {}).get(sku, 0)
-    
-    # Look for stock in variations
-    variation_stock = 0
-    if product_id in variations:
-        for variation in variations[product_id]:
-            var_sku = variation.get('sku')
-            var_stock = stock_data.get('variations', {}).get(var_sku, 0)
-            variation_stock += var_stock
-    
-    total_stock = direct_stock + variation_stock
-    
-    if total_stock <= 1:
-        return False, f"No stock available (direct: {direct_stock}, variations: {variation_stock})"
+    if 'parent_sku' in product:
+        # Variation offer (feed_variations): its own stock, the parent's localized info
+        total_stock = product['stock']
+        sku = product['parent_sku']
+    else:
+        # Look for stock in direct stock data
+        direct_stock = stock_data.get('products', {}).get(sku, 0)
+        
+        # Look for stock in variations
+        variation_stock = 0
+        if product_id in variations:
+            for variation in variations[product_id]:
+                var_sku = variation.get('sku')
+                var_stock = stock_data.get('variations', {}).get(var_sku, 0)
+                variation_stock += var_stock
+        
+        total_stock = direct_stock + variation_stock
     
     # Validate product info exists
     if sku not in info:
@@ -348,11 +407,461 @@ def create_html_page(unique_data, margin, files_created, country, config):
     
     return html_content
 
-def main():
-    """Main function with proper stock validation - PRODUCTION VERSION"""
+def new_validation_stats():
+    """Empty validation counters"""
+    return {
+        'total_processed': 0,
+        'missing_sku': 0,
+        'invalid_ean': 0,
+        'not_new_condition': 0,
+        'invalid_price': 0,
+        'no_stock': 0,
+        'no_product_info': 0,
+        'invalid_name': 0,
+        'price_too_high': 0,
+        'price_too_low': 0,
+        'weight_too_high': 0,
+        'volume_too_high': 0,
+        'adult_content': 0,
+        'valid_products': 0,
+        # Eligibility mask tallies of every feed (EligibilityRules.report)
+        'eligibility': {},
+        # (sku, reason or None when valid, offending value) of every offer, for the rejection ledger
+        'ledger': []
+    }
+
+def count_validation_failure(validation_stats, reason):
+    """Count the specific validation failure returned by validate_product_data; returns its reason code"""
+    if "Missing sku" in reason:
+        code = 'missing_sku'
+    elif "Invalid EAN13" in reason:
+        code = 'invalid_ean'
+    elif "Not NEW condition" in reason:
+        code = 'not_new_condition'
+    elif "Invalid price" in reason:
+        code = 'invalid_price'
+    elif "No product information" in reason:
+        code = 'no_product_info'
+    elif "Invalid product name" in reason:
+        code = 'invalid_name'
+    else:
+        # Other missing fields are only recorded in the ledger
+        return 'missing_field'
+    validation_stats[code] += 1
+    return code
+
+def fetch_taxonomy_payloads(api, checkpoint, taxonomy, language):
+    """Fetch the six endpoint payloads of one taxonomy (from the checkpoint when available)"""
+    tax_id = taxonomy['id']
+    started = time.monotonic()
+    resumed_units = checkpoint.resumed_units
+    payloads = {
+        'taxonomy': taxonomy,
+        'products': checkpoint.fetch(tax_id, 'products', lambda: api.get_products(tax_id)),
+        'variations': checkpoint.fetch(tax_id, 'variations', lambda: api.get_product_variations(tax_id)),
+        'stock': checkpoint.fetch(tax_id, 'stock', lambda: api.get_product_stock(tax_id)),
+        'variations_stock': checkpoint.fetch(tax_id, 'variations_stock', lambda: api.get_variations_stock(tax_id)),
+        'info': checkpoint.fetch(tax_id, 'info', lambda: api.get_product_info(tax_id, language)),
+        'images': checkpoint.fetch(tax_id, 'images', lambda: api.get_product_images(tax_id)),
+    }
+    # Timing telemetry for the time budget, only for a full fetch from the API
+    payloads['fetch_seconds'] = time.monotonic() - started if checkpoint.resumed_units == resumed_units else None
+    return payloads
+
+def new_batch():
+    """Empty set of validation lookups"""
+    return {
+        'products': [],
+        'product_taxonomy': {},
+        'variations': {},
+        'stock_data': {'products': {}, 'variations': {}},
+        'info': {},
+        'images': {},
+    }
+
+def join_taxonomy_payloads(payloads, counters):
+    """Join one taxonomy's endpoint payloads into the lookups used for validation"""
+    tax_id = str(payloads['taxonomy']['id'])
+    batch = new_batch()
+    if payloads.get('fetch_seconds'):
+        counters['fetch_seconds'] = round(payloads['fetch_seconds'], 1)
+    
+    # Products (randomize and limit per category to its predicted quota)
+    products = payloads['products']
+    if products:
+        random.shuffle(products)
+        limited_products = products[:counters['quota']]
+        counters['available'] = len(products)
+        counters['fetched'] = len(limited_products)
+        batch['products'] = limited_products
+        for product in limited_products:
+            batch['product_taxonomy'][product.get('id')] = tax_id
+    
+    # Variations by parent product
+    for variation in payloads['variations'] or []:
+        batch['variations'].setdefault(variation.get('product'), []).append(variation)
+    
+    # Direct product stock and variation stock
+    for endpoint, stock_key in (('stock', 'products'), ('variations_stock', 'variations')):
+        for stock_item in payloads[endpoint] or []:
+            sku = stock_item.get('sku')
+            stocks = stock_item.get('stocks', [])
+            total_quantity = sum(stock.get('quantity', 0) for stock in stocks)
+            if sku and total_quantity > 0:
+                batch['stock_data'][stock_key][sku] = total_quantity
+    
+    # Descriptions
+    for item in payloads['info'] or []:
+        batch['info'][item['sku']] = item
+    
+    # Images
+    for img_set in payloads['images'] or []:
+        images = img_set.get('images', [])
+        if images:
+            batch['images'][img_set['id']] = {
+                'image1': images[0].get('url', '') if len(images) > 0 else '',
+                'image2': images[1].get('url', '') if len(images) > 1 else '',
+                'image3': images[2].get('url', '') if len(images) > 2 else '',
+                'image4': images[3].get('url', '') if len(images) > 3 else ''
+            }
+    
+    return batch
+
+def merge_batches(batches):
+    """Combine per-taxonomy batches into one set of lookups"""
+    merged = new_batch()
+    for batch in batches:
+        merged['products'].extend(batch['products'])
+        merged['product_taxonomy'].update(batch['product_taxonomy'])
+        for product_id, variations in batch['variations'].items():
+            merged['variations'].setdefault(product_id, []).extend(variations)
+        merged['stock_data']['products'].update(batch['stock_data']['products'])
+        merged['stock_data']['variations'].update(batch['stock_data']['variations'])
+        merged['info'].update(batch['info'])
+        merged['images'].update(batch['images'])
+    return merged
+
+def build_offer_row(product, batch, settings, validation_stats):
+    """Validate one product against the Kaufland filters and render its CSV row (None if rejected)"""
+    
+    # Validate product data
+    is_valid, stock_or_reason = validate_product_data(
+        product, batch['info'], batch['variations'], batch['stock_data']
+    )
+    
+    if not is_valid:
+        reason = count_validation_failure(validation_stats, stock_or_reason)
+        validation_stats['ledger'].append((product.get('sku'), reason, stock_or_reason.partition(': ')[2] or stock_or_reason))
+        return None
+    
+    total_stock = stock_or_reason  # stock_or_reason contains stock when valid
+    
+    # Calculate dimensions, content volume and price
+    weight = safe_float(product.get('weight', 0))
+    width = safe_float(product.get('width', 0))
+    height = safe_float(product.get('height', 0))
+    depth = safe_float(product.get('depth', 0))
+    content_volume = width * height * depth
+    wholesale_eur = safe_float(product.get('wholesalePrice', 0))
+    price_eur = (wholesale_eur * (1 + settings['vat']) * (1 + settings['margin'])) + settings['base_price']
+    price_local = price_eur * settings['currency_rate']
+    
+    # Stock, weight, volume and price limits of every marketplace in one pass
+    eligibility = settings['eligibility']
+    values = {'stock': total_stock, 'weight': weight, 'volume': content_volume, 'price': price_eur}
+    _, failures = eligibility.evaluate(values, validation_stats['eligibility'])
+    reason = eligibility.rejection(failures, settings['eligibility_bit'])
+    if reason:
+        validation_stats[reason] += 1
+        validation_stats['ledger'].append((product['sku'], reason, values[REASON_ATTRIBUTES[reason]]))
+        return None
+    
+    # Calculate safe quantity
+    real_quantity = calculate_real_quantity(total_stock)
+    if real_quantity <= 0:
+        validation_stats['no_stock'] += 1
+        validation_stats['ledger'].append((product['sku'], 'no_stock', total_stock))
+        return None
+    
+    # Adult products hidden in mixed categories (localized name and description)
+    adult_term = adult_content_match(batch['info'].get(product.get('parent_sku', product['sku']), {}))
+    if adult_term:
+        validation_stats['adult_content'] += 1
+        validation_stats['ledger'].append((product['sku'], 'adult_content', adult_term))
+        return None
+    
+    validation_stats['valid_products'] += 1
+    validation_stats['ledger'].append((product['sku'], None, None))
+    
+    # Get additional data
+    sku = product['sku']
+    product_id = product['id']
+    info = batch['info'].get(product.get('parent_sku', sku), {})
+    images = batch['images'].get(product_id, {})
+    # Variation offers carry their attribute values in the title (and ManoMano attribute columns)
+    attributes = product.get('variation_attributes', [])
+    
+    # Create CSV row
+    row = {
+        'id_offer': str(sku),
+        'ean': safe_str(product.get('ean13')),
+        'locale': settings['locale'],
+        'category': 'Gardening & DIY',
+        'title': variation_title(safe_str(info.get('name', 'Product')), attributes, 100),
+        'short_description': truncate_description(safe_str(info.get('description', '')), 150),
+        'description': truncate_description(safe_str(info.get('description', '')), 500),
+        'manufacturer': 'Pop Pulse Emporium',
+        'picture_1': images.get('image1', ''),
+        'picture_2': images.get('image2', ''),
+        'picture_3': images.get('image3', ''),
+        'picture_4': images.get('image4', ''),
+        'price_cs': round(price_local, 2),
+        'quantity': real_quantity,
+        'condition': 'NEW',
+        'length': round(depth, 2),
+        'width': round(width, 2),
+        'height': round(height, 2),
+        'weight': round(weight, 2),
+        'content_volume': round(content_volume, 2),
+        'currency': settings['currency'],
+        'handling_time': 2,
+        'delivery_time_max': 5,
+        'delivery_time_min': 3
+    }
+    
+    if settings['scoring']:
+        # Expected value for the top-k selection (not a CSV column)
+        margin_eur = price_eur - wholesale_eur * (1 + settings['vat'])
+        row['_score'] = offer_score(settings['scoring'], margin_eur, real_quantity, batch['product_taxonomy'].get(product_id))
+    return row
+
+def process_batch(batch, settings, validation_stats, yield_counters, csv_data, sample_size):
+    """Validate a batch's products into csv_data; returns True once sample_size is reached"""
+    for product in batch['products']:
+        counters = yield_counters[batch['product_taxonomy'][product.get('id')]]
+        counters['processed'] += 1
+        
+        # The product itself, or one offer per variation (the yield counts products, offers are counted apart)
+        product_valid = False
+        for offer in product_offers(product, batch, settings['variations']):
+            validation_stats['total_processed'] += 1
+            row = build_offer_row(offer, batch, settings, validation_stats)
+            if row is None:
+                continue
+            
+            if not product_valid:
+                product_valid = True
+                counters['valid'] += 1
+            counters['offers'] += 1
+            # Fetched taxonomy of the offer, for taxonomy-sharded output (not a CSV column)
+            row['_taxonomy'] = batch['product_taxonomy'][product.get('id')]
+            csv_data.append(row)
+            
+            # Progress update every 1000 offers
+            if validation_stats['total_processed'] % 1000 == 0:
+                print(f"   📊 Processed {validation_stats['total_processed']:,}, found {validation_stats['valid_products']:,} valid")
+            
+            # Stop if we have enough products
+            if len(csv_data) >= sample_size:
+                print(f"🎯 Reached target of {sample_size} products")
+                return True
+    return False
+
+def validate_shard(shard):
+    """Process-pool worker: validate and render one shard of products"""
+    batch, settings = shard
+    validation_stats = new_validation_stats()
+    yield_counters = {tax_id: {'processed': 0, 'valid': 0, 'offers': 0} for tax_id in set(batch['product_taxonomy'].values())}
+    rows = []
+    process_batch(batch, settings, validation_stats, yield_counters, rows, float('inf'))
+    return rows, validation_stats, yield_counters, drain_description_cache()
+
+def print_selection(top):
+    print(f"🏆 Selected top {len(top.heap):,} of {top.seen:,} offers by expected value (score cutoff {top.cutoff()})")
+
+def run_phased(api, checkpoint, taxonomies, config, settings, validation_stats, yield_counters, sample_size, writer, workers=1, budget=None):
+    """Fetch every taxonomy, then validate everything, then write the CSV"""
+    batches = []
+    
+    print("\n🔄 Collecting Products, Variations, and Stock Data...")
+    
+    for i, taxonomy in enumerate(taxonomies):
+        if budget and budget.exhausted():
+            break
+        print(f"📦 {i+1}/{len(taxonomies)}: {taxonomy['name']}")
+        payloads = fetch_taxonomy_payloads(api, checkpoint, taxonomy, config['language'])
+        batches.append(join_taxonomy_payloads(payloads, yield_counters[str(taxonomy['id'])]))
+    
+    rate_stats = api.rate_limiter.stats()
+    print(f"✅ Collection Complete:")
+    print(f"   🚦 Requests: {rate_stats['requests']} (rate {rate_stats['current_rate']} req/s, throttled {rate_stats['throttled_seconds']}s, 429s: {rate_stats['throttled_responses']})")
+    print(f"   📦 Products: {sum(len(b['products']) for b in batches)}")
+    print(f"   📊 Product stock entries: {sum(len(b['stock_data']['products']) for b in batches)}")
+    print(f"   📊 Variation stock entries: {sum(len(b['stock_data']['variations']) for b in batches)}")
+    print(f"   📝 Descriptions: {sum(len(b['info']) for b in batches)}")
+    print(f"   🖼️ Images: {sum(len(b['images']) for b in batches)}")
+    
+    # Candidates are ranked by expected value (top sample_size kept), or shuffled and cut
+    top = TopK(sample_size) if settings['scoring'] else None
+    
+    print("\n🔍 Validating Products with Stock...")
+    
+    if workers > 1:
+        # Shards are validated in worker processes and merged back in shard order
+        if os.getenv('FEED_SHARD_BY', 'taxonomy') == 'sku':
+            shards = split_batch_by_sku(merge_batches(batches), workers * 4)
+        else:
+            shards = [batch for batch in batches if batch['products']]
+        print(f"🧵 Validating {len(shards)} shards on {workers} worker processes")
+        
+        csv_data = []
+        with new_worker_pool(workers) as executor:
+            for result in executor.map(validate_shard, [(shard, settings) for shard in shards]):
+                csv_data.extend(merge_shard_result(result, validation_stats, yield_counters))
+        
+        if top is None:
+            # Shuffle the merged rows for randomization (deterministic for a given seed)
+            random.shuffle(csv_data)
+            if len(csv_data) >= sample_size:
+                print(f"🎯 Reached target of {sample_size} products")
+                csv_data = csv_data[:sample_size]
+    else:
+        batch = merge_batches(batches)
+        
+        # Shuffle all products for randomization
+        random.shuffle(batch['products'])
+        
+        csv_data = []
+        process_batch(batch, settings, validation_stats, yield_counters, csv_data, sample_size if top is None else float('inf'))
+    
+    if top is not None:
+        for row in csv_data:
+            top.add(row)
+        csv_data = top.rows()
+        print_selection(top)
+    
+    for row in csv_data:
+        writer.write(row)
+    return {'mode': 'phased', 'workers': workers, 'selection': top.report() if top else {'mode': 'random'}}
+
+def run_pipelined(api, checkpoint, taxonomies, config, settings, validation_stats, yield_counters, sample_size, writer, workers=1, budget=None):
+    """Fetch, validate and write concurrently: each taxonomy is validated and written as soon as it is joined"""
+    pipeline = Pipeline(queue_size=int(os.getenv('FEED_PIPELINE_QUEUE', '2')))
+    executor = new_worker_pool(workers) if workers > 1 else None
+    csv_data = []
+    # With scoring every candidate is ranked and the top sample_size are written at the end
+    top = TopK(sample_size) if settings['scoring'] else None
+    
+    print("\n🔄 Pipelined fetch → validate → write...")
+    
+    def fetch_stage():
+        for i, taxonomy in enumerate(taxonomies):
+            if budget and budget.exhausted():
+                break
+            print(f"📦 {i+1}/{len(taxonomies)}: {taxonomy['name']}")
+            yield fetch_taxonomy_payloads(api, checkpoint, taxonomy, config['language'])
+    
+    def validate_stage(payloads):
+        batch = join_taxonomy_payloads(payloads, yield_counters[str(payloads['taxonomy']['id'])])
+        if pipeline.stopped:
+            return None
+        if executor:
+            # Validated in a worker process, collected in taxonomy order by the write stage
+            return executor.submit(validate_shard, (batch, settings))
+        if top is not None:
+            rows = []
+            process_batch(batch, settings, validation_stats, yield_counters, rows, float('inf'))
+            return rows
+        start = len(csv_data)
+        if process_batch(batch, settings, validation_stats, yield_counters, csv_data, sample_size):
+            pipeline.stop()
+        return csv_data[start:]
+    
+    def write_stage(rows):
+        if executor:
+            if top is None and len(csv_data) >= sample_size:
+                rows.cancel()
+                return
+            rows = merge_shard_result(rows.result(), validation_stats, yield_counters)
+            if top is None:
+                rows = rows[:sample_size - len(csv_data)]
+                csv_data.extend(rows)
+                if len(csv_data) >= sample_size:
+                    print(f"🎯 Reached target of {sample_size} products")
+                    pipeline.stop()
+        for row in rows:
+            if top is not None:
+                top.add(row)
+            else:
+                writer.write(row)
+    
+    try:
+        timings = pipeline.run(fetch_stage(), [('validate', validate_stage), ('write', write_stage)])
+        if top is not None:
+            print_selection(top)
+            for row in top.rows():
+                writer.write(row)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    
+    rate_stats = api.rate_limiter.stats()
+    print(f"✅ Pipeline Complete in {timings['wall_seconds']}s (busy: {timings['busy_seconds']})")
+    print(f"   🚦 Requests: {rate_stats['requests']} (rate {rate_stats['current_rate']} req/s, throttled {rate_stats['throttled_seconds']}s, 429s: {rate_stats['throttled_responses']})")
+    return {'mode': 'pipelined', 'workers': workers, 'selection': top.report() if top else {'mode': 'random'}, **timings}
+
+def run_full_catalog(api, checkpoint, taxonomies, config, settings, validation_stats, yield_counters, sample_size, writer, workers=1, budget=None):
+    """Stream every taxonomy through validation under a memory ceiling; rows spill to sorted runs merged by EAN"""
+    memory_mb = int(os.getenv('FEED_MEMORY_MB', '512'))
+    spill = SpillBuffer(os.path.join(checkpoint.directory, 'spill'), memory_mb * 1024 * 1024)
+    pipeline = Pipeline(queue_size=int(os.getenv('FEED_PIPELINE_QUEUE', '2')))
+    executor = new_worker_pool(workers) if workers > 1 else None
+    
+    print(f"\n🔄 Full catalog: streaming {len(taxonomies)} categories (memory ceiling {memory_mb} MB)...")
+    
+    def fetch_stage():
+        for i, taxonomy in enumerate(taxonomies):
+            if budget and budget.exhausted():
+                break
+            print(f"📦 {i+1}/{len(taxonomies)}: {taxonomy['name']}")
+            yield fetch_taxonomy_payloads(api, checkpoint, taxonomy, config['language'])
+    
+    def validate_stage(payloads):
+        # Only one taxonomy's lookups are alive at a time (plus the bounded queues)
+        batch = join_taxonomy_payloads(payloads, yield_counters[str(payloads['taxonomy']['id'])])
+        if executor:
+            return executor.submit(validate_shard, (batch, settings))
+        rows = []
+        process_batch(batch, settings, validation_stats, yield_counters, rows, float('inf'))
+        return rows
+    
+    def spill_stage(rows):
+        if executor:
+            rows = merge_shard_result(rows.result(), validation_stats, yield_counters)
+        for row in rows:
+            spill.add(row)
+    
+    try:
+        timings = pipeline.run(fetch_stage(), [('validate', validate_stage), ('spill', spill_stage)])
+        print(f"🔀 Merging {len(spill.runs)} spilled run(s) by EAN...")
+        for row in spill.merged():
+            writer.write(row)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        spill.cleanup()
+    
+    rate_stats = api.rate_limiter.stats()
+    print(f"✅ Full catalog complete in {timings['wall_seconds']}s (busy: {timings['busy_seconds']})")
+    print(f"   🚦 Requests: {rate_stats['requests']} (rate {rate_stats['current_rate']} req/s, throttled {rate_stats['throttled_seconds']}s, 429s: {rate_stats['throttled_responses']})")
+    return {'mode': 'full_catalog', 'workers': workers, 'memory_mb': memory_mb, 'spill': spill.stats(), **timings}
+
+def main(country=None, api=None, catalog=None):
+    """Main function with proper stock validation - PRODUCTION VERSION (feed_daemon passes country, api and its warm catalog)"""
     print("🚀 STARTING KAUFLAND FEED GENERATION WITH STOCK VALIDATION")
     print("=" * 70)
     print(f"⏰ Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    run_started = time.monotonic()
     
     # Get API key from environment
     api_key = os.getenv('BIGBUY_API_KEY')
@@ -362,8 +871,11 @@ def main():
     
     print(f"🔑 API key found (length: {len(api_key)})")
     
+    # Optional deadline (FEED_TIME_BUDGET minutes), counted from the start of the run
+    budget = RunBudget.from_env()
+    
     # Get country from environment
-    country = os.getenv('COUNTRY_CODE', 'IT').upper()
+    country = (country or os.getenv('COUNTRY_CODE', 'IT')).upper()
     
     # Country configuration
     country_config = {
@@ -389,253 +901,122 @@ def main():
     random_seed = create_random_seed()
     random.seed(random_seed)
     
-    api = BigBuyAPI(api_key)
+    if api is None:
+        api = BigBuyAPI(api_key)
     
     # Configuration
     margin = 0.30
     vat = 0.22
     base_price = 0.75
-    max_price_limit_eur = 200.0
-    min_price_limit_eur = 6.0
+    # Limits come from the shared marketplace rules (feed_rules)
+    feed_key = f"kaufland_{country.lower()}"
+    limits = MARKETPLACE_RULES[feed_key]
+    max_price_limit_eur = limits['max_price']
+    min_price_limit_eur = limits['min_price']
     max_price_limit = max_price_limit_eur * currency_info['rate']
     min_price_limit = min_price_limit_eur * currency_info['rate']
-    max_content_volume = 70000
-    max_weight = 25.0
+    max_content_volume = limits['max_volume']
+    max_weight = limits['max_weight']
     sample_size = 25000  # Production sample size
+    pipelined = os.getenv('FEED_PIPELINE', '').lower() in ('1', 'true', 'yes')
+    workers = int(os.getenv('FEED_WORKERS', '1'))
+    full_catalog = os.getenv('FULL_CATALOG', '').lower() in ('1', 'true', 'yes')
+    
+    # Every marketplace's limits are evaluated together, for the cross-marketplace report
+    eligibility = compile_rules()
+    settings = {
+        'margin': margin,
+        'vat': vat,
+        'base_price': base_price,
+        'currency': currency_info['currency'],
+        'currency_rate': currency_info['rate'],
+        'locale': config['locale'],
+        'eligibility': eligibility,
+        'eligibility_bit': eligibility.bit(feed_key),
+        'scoring': load_score_config(),
+    }
     
     print(f"💰 Max price limit: {currency_info['currency']}{max_price_limit:.2f}")
     print(f"💰 Min price limit: {currency_info['currency']}{min_price_limit:.2f}")
     print(f"📦 Max content volume: {max_content_volume:,} cm³")
     print(f"⚖️ Max weight: {max_weight} kg")
     print(f"🎯 Target sample size: {sample_size}")
+    print(f"⚙️ Execution mode: {'full catalog' if full_catalog else 'pipelined' if pipelined else 'phased'}, {workers} validation worker(s)")
     
-    # Get taxonomies
-    taxonomies = api.get_taxonomies(limit=20)  # Process 20 categories for variety
+    # Country-specific output files
+    if country == 'IT':
+        filename = 'kaufland_feed.csv'
+        html_filename = 'index.html'
+        info_filename = 'feed_info.json'
+    else:
+        filename = f'kaufland_feed_{country.lower()}.csv'
+        html_filename = f'index_{country.lower()}.html'
+        info_filename = f'feed_info_{country.lower()}.json'
+    
+    # Sanitized, tag-safe descriptions memoized across runs by content hash
+    description_cache = load_description_cache(os.getenv('FEED_CACHE_DIR', '.feed_cache'), feed_key)
+    
+    # Get taxonomies (resumable fetch: completed (taxonomy, endpoint) payloads are checkpointed)
+    checkpoint = catalog or FetchCheckpoint(os.getenv('FEED_WORK_DIR', '.feed_work'), feed_key + ('_full' if full_catalog else ''))
+    # Sampled runs fetch specific subcategories of the daily-cached tree (small, focused payloads);
+    # the full catalog fetches whole departments, which also cover products filed on inner nodes
+    tree = None if full_catalog else load_taxonomy_tree(api, os.getenv('FEED_CACHE_DIR', '.feed_cache'))
+    category_limit = int(os.getenv('FEED_CATEGORY_LIMIT', '60' if tree else '20'))  # Categories for variety
+    taxonomies = checkpoint.taxonomies(lambda: api.get_taxonomies(limit=None if full_catalog else category_limit, tree=tree))
     if not taxonomies:
         print("❌ No taxonomies found")
         return
     
     print(f"📊 Processing {len(taxonomies)} categories")
     
-    # Collect all data including STOCK
-    all_products = []
-    all_info = []
-    all_images = []
-    all_variations = {}
-    all_stock_data = {'products': {}, 'variations': {}}
-    
-    print("\n🔄 Collecting Products, Variations, and Stock Data...")
+    # Each variation is its own offer, titled with its localized attribute values (opt-in with FEED_VARIATION_OFFERS=1, otherwise parent offers)
+    settings['variations'] = variation_names_from_env(api, checkpoint, config['language'])
+    
+    # Per-taxonomy fetch quotas predicted from previous pass rates
+    taxonomy_history = load_taxonomy_yield(info_filename)
+    if budget:
+        # Only the categories whose estimated fetch time fits before the deadline
+        taxonomies = budget.plan(taxonomies, taxonomy_history)
+    default_quotas = {str(taxonomy['id']): 500 for taxonomy in taxonomies}
+    quota_plan = compute_taxonomy_quotas(taxonomies, taxonomy_history, sample_size, default_quotas)
+    yield_counters = new_yield_counters(taxonomies, quota_plan)
+    print(f"📐 Quotas: {sum(p['quota'] for p in quota_plan.values()):,} products, predicted valid: {sum(p['predicted_valid'] for p in quota_plan.values()):,.0f}")
+    if full_catalog:
+        # Every product of every taxonomy: no per-taxonomy quota
+        for counters in yield_counters.values():
+            counters['quota'] = None
+    
+    # Rows are deduplicated by EAN and streamed to a temporary CSV
+    validation_stats = new_validation_stats()
+    # Offer hashes are indexed for the change log against the previous run
+    index = RowIndex(os.getenv('FEED_STATE_DIR', 'feed_state'), feed_key, FEED_FIELDNAMES, 'id_offer', 'price_cs')
+    # Optional bounded shards with a manifest (FEED_OUTPUT_SHARD_ROWS / FEED_OUTPUT_SHARD_MB)
+    shards = sharded_output_from_env(filename, FEED_FIELDNAMES, 'id_offer')
+    # Canonical order (by EAN) and float formatting keep unchanged rows byte-identical for git;
+    # full-catalog rows already come out of the spill merge sorted by EAN
+    canonical = os.getenv('FEED_CANONICAL_OUTPUT', '').lower() in ('1', 'true', 'yes')
+    # Image URLs are checked before publish (FEED_IMAGE_CHECK=off|flag|drop, results shared in .feed_images)
+    images = image_verifier_from_env(IMAGE_FIELDS, 'id_offer', budget)
+    # (full catalog keeps only the fields the report needs for rows past the HTML preview)
+    writer = FeedCsvWriter(filename, FEED_FIELDNAMES, index=index, keep_fields=('price_cs', 'quantity') if full_catalog else None, shards=shards,
+                           canonical=canonical, presorted=full_catalog, images=images)
+    try:
+        run = run_full_catalog if full_catalog else run_pipelined if pipelined else run_phased
+        execution = run(api, checkpoint, taxonomies, config, settings, validation_stats, yield_counters, sample_size, writer, workers, budget)
+        writer.flush()
+    except Exception:
+        writer.discard()
+        raise
     
-    for i, taxonomy in enumerate(taxonomies):
-        tax_id = taxonomy['id']
-        tax_name = taxonomy['name']
-        
-        print(f"📦 {i+1}/{len(taxonomies)}: {tax_name}")
-        
-        # Get products (randomize and limit per category)
-        products = api.get_products(tax_id)
-        if products:
-            random.shuffle(products)
-            limited_products = products[:500]  # Limit per category
-            all_products.extend(limited_products)
-        
-        # Get variations
-        variations = api.get_product_variations(tax_id)
-        if variations:
-            for variation in variations:
-                product_id = variation.get('product')
-                if product_id not in all_variations:
-                    all_variations[product_id] = []
-                all_variations[product_id].append(variation)
-        
-        # Get direct product stock
-        product_stock = api.get_product_stock(tax_id)
-        if product_stock:
-            for stock_item in product_stock:
-                sku = stock_item.get('sku')
-                stocks = stock_item.get('stocks', [])
-                total_quantity = sum(stock.get('quantity', 0) for stock in stocks)
-                if sku and total_quantity > 0:
-                    all_stock_data['products'][sku] = total_quantity
-        
-        # Get variation stock
-        variation_stock = api.get_variations_stock(tax_id)
-        if variation_stock:
-            for stock_item in variation_stock:
-                sku = stock_item.get('sku')
-                stocks = stock_item.get('stocks', [])
-                total_quantity = sum(stock.get('quantity', 0) for stock in stocks)
-                if sku and total_quantity > 0:
-                    all_stock_data['variations'][sku] = total_quantity
-        
-        # Get descriptions
-        info = api.get_product_info(tax_id, config['language'])
-        if info:
-            all_info.extend(info)
-        
-        # Get images
-        images = api.get_product_images(tax_id)
-        if images:
-            all_images.extend(images)
-        
-        time.sleep(0.5)  # Rate limiting
+    description_cache.save()
     
-    print(f"✅ Collection Complete:")
-    print(f"   📦 Products: {len(all_products)}")
-    print(f"   📊 Product stock entries: {len(all_stock_data['products'])}")
-    print(f"   📊 Variation stock entries: {len(all_stock_data['variations'])}")
-    print(f"   📝 Descriptions: {len(all_info)}")
-    print(f"   🖼️ Images: {len(all_images)}")
-    
-    # Create lookup dictionaries
-    info_dict = {item['sku']: item for item in all_info}
-    image_dict = {}
-    
-    for img_set in all_images:
-        product_id = img_set['id']
-        images = img_set.get('images', [])
-        if images:
-            image_dict[product_id] = {
-                'image1': images[0].get('url', '') if len(images) > 0 else '',
-                'image2': images[1].get('url', '') if len(images) > 1 else '',
-                'image3': images[2].get('url', '') if len(images) > 2 else '',
-                'image4': images[3].get('url', '') if len(images) > 3 else ''
-            }
+    if writer.image_check:
+        check = writer.image_check
+        print(f"🖼️ Image check ({check['mode']}): {check['urls']:,} URLs, {check['checked']:,} checked ({check['skipped']:,} skipped by the time budget), {check['dead']:,} dead, {check['offers_dropped']:,} offers dropped, {check['offers_flagged']:,} flagged in {check['seconds']}s")
     
-    print("\n🔍 Validating Products with Stock...")
-    
-    # Validate and process products
-    csv_data = []
-    validation_stats = {
-        'total_processed': 0,
-        'missing_sku': 0,
-        'invalid_ean': 0,
-        'not_new_condition': 0,
-        'invalid_price': 0,
-        'no_stock': 0,
-        'no_product_info': 0,
-        'invalid_name': 0,
-        'price_too_high': 0,
-        'price_too_low': 0,
-        'weight_too_high': 0,
-        'volume_too_high': 0,
-        'valid_products': 0
-    }
-    
-    # Shuffle all products for randomization
-    random.shuffle(all_products)
-    
-    for product in all_products:
-        validation_stats['total_processed'] += 1
-        
-        # Validate product data
-        is_valid, stock_or_reason = validate_product_data(
-            product, info_dict, all_variations, all_stock_data
-        )
-        
-        if not is_valid:
-            # Count the specific validation failure
-            if "Missing sku" in stock_or_reason:
-                validation_stats['missing_sku'] += 1
-            elif "Invalid EAN13" in stock_or_reason:
-                validation_stats['invalid_ean'] += 1
-            elif "Not NEW condition" in stock_or_reason:
-                validation_stats['not_new_condition'] += 1
-            elif "Invalid price" in stock_or_reason:
-                validation_stats['invalid_price'] += 1
-            elif "No stock available" in stock_or_reason:
-                validation_stats['no_stock'] += 1
-            elif "No product information" in stock_or_reason:
-                validation_stats['no_product_info'] += 1
-            elif "Invalid product name" in stock_or_reason:
-                validation_stats['invalid_name'] += 1
-            continue
-        
-        total_stock = stock_or_reason  # stock_or_reason contains stock when valid
-        
-        # Additional filters
-        weight = safe_float(product.get('weight', 0))
-        if weight > max_weight:
-            validation_stats['weight_too_high'] += 1
-            continue
-        
-        # Calculate dimensions and content volume
-        width = safe_float(product.get('width', 0))
-        height = safe_float(product.get('height', 0))
-        depth = safe_float(product.get('depth', 0))
-        content_volume = width * height * depth
-        
-        if content_volume > max_content_volume:
-            validation_stats['volume_too_high'] += 1
-            continue
-        
-        # Calculate price
-        wholesale_eur = safe_float(product.get('wholesalePrice', 0))
-        price_eur = (wholesale_eur * (1 + vat) * (1 + margin)) + base_price
-        price_local = price_eur * currency_info['rate']
-        
-        if price_local > max_price_limit:
-            validation_stats['price_too_high'] += 1
-            continue
-
-        min_price_eur = min_price_limit
-        min_price_local = min_price_eur * currency_info['rate']
-        if price_local < min_price_local:
-            validation_stats['price_too_low'] += 1  # Add this to validation_stats dict
-            continue
-        
-        # Calculate safe quantity
-        real_quantity = calculate_real_quantity(total_stock)
-        if real_quantity <= 0:
-            validation_stats['no_stock'] += 1
-            continue
-        
-        validation_stats['valid_products'] += 1
-        
-        # Get additional data
-        sku = product['sku']
-        product_id = product['id']
-        info = info_dict.get(sku, {})
-        images = image_dict.get(product_id, {})
-        
-        # Create CSV row
-        row = {
-            'id_offer': str(sku),
-            'ean': safe_str(product.get('ean13')),
-            'locale': config['locale'],
-            'category': 'Gardening & DIY',
-            'title': safe_str(info.get('name', 'Product'))[:100],
-            'short_description': safe_str(info.get('description', ''))[:150],
-            'description': safe_str(info.get('description', ''))[:500],
-            'manufacturer': 'Pop Pulse Emporium',
-            'picture_1': images.get('image1', ''),
-            'picture_2': images.get('image2', ''),
-            'picture_3': images.get('image3', ''),
-            'picture_4': images.get('image4', ''),
-            'price_cs': round(price_local, 2),
-            'quantity': real_quantity,
-            'condition': 'NEW',
-            'length': round(depth, 2),
-            'width': round(width, 2),
-            'height': round(height, 2),
-            'weight': round(weight, 2),
-            'content_volume': round(content_volume, 2),
-            'currency': currency_info['currency'],
-            'handling_time': 2,
-            'delivery_time_max': 5,
-            'delivery_time_min': 3
-        }
-        
-        csv_data.append(row)
-        
-        # Progress update every 1000 products
-        if validation_stats['total_processed'] % 1000 == 0:
-            print(f"   📊 Processed {validation_stats['total_processed']:,}, found {validation_stats['valid_products']:,} valid")
-        
-        # Stop if we have enough products
-        if len(csv_data) >= sample_size:
-            print(f"🎯 Reached target of {sample_size} products")
-            break
+    # Eligibility of the products with valid data on every marketplace (feed_rules)
+    eligibility_report = eligibility.report(validation_stats.pop('eligibility'))
+    ledger_entries = validation_stats.pop('ledger')
     
     # Print validation statistics
     print(f"\n🔍 VALIDATION STATISTICS:")
@@ -645,26 +1026,24 @@ def main():
     print(f"   ❌ Volume too high: {validation_stats['volume_too_high']:,}")
     print(f"   ❌ Price too high: {validation_stats['price_too_high']:,}")
     print(f"   ❌ Weight too high: {validation_stats['weight_too_high']:,}")
+    print(f"   🔞 Adult content: {validation_stats['adult_content']:,}")
     print(f"   ❌ Other issues: {validation_stats['missing_sku'] + validation_stats['not_new_condition'] + validation_stats['invalid_price'] + validation_stats['no_product_info'] + validation_stats['invalid_name']:,}")
     print(f"   ✅ Valid products: {validation_stats['valid_products']:,}")
+    within_limits = ', '.join(f"{feed} {entry['eligible']:,}" for feed, entry in eligibility_report.items())
+    print(f"   🧮 Within limits per feed: {within_limits}")
     
     if validation_stats['total_processed'] > 0:
         success_rate = 100 * validation_stats['valid_products'] / validation_stats['total_processed']
         print(f"   📈 Success rate: {success_rate:.1f}%")
     
-    # Remove duplicates by EAN
-    seen_eans = set()
-    unique_data = []
-    
-    for row in csv_data:
-        ean = row['ean']
-        if ean and ean not in seen_eans:
-            seen_eans.add(ean)
-            unique_data.append(row)
+    predicted_valid = sum(run['fetched'] * quota_plan[tax_id]['pass_rate'] for tax_id, run in yield_counters.items())
+    print(f"   📐 Yield: predicted {predicted_valid:,.0f} valid, actual {validation_stats['valid_products']:,}")
     
+    unique_data = writer.rows
     print(f"\n✅ Found {len(unique_data)} unique products after deduplication")
     
     if not unique_data:
+        writer.discard()
         print("❌ No valid products found!")
         print("💡 Possible issues:")
         print("   - Stock endpoints not accessible")
@@ -675,36 +1054,45 @@ def main():
     # Create files
     print("\n📁 Creating Output Files...")
     
-    # Create country-specific files
-    if country == 'IT':
-        filename = 'kaufland_feed.csv'
-        html_filename = 'index.html'
-        info_filename = 'feed_info.json'
-    else:
-        filename = f'kaufland_feed_{country.lower()}.csv'
-        html_filename = f'index_{country.lower()}.html'
-        info_filename = f'feed_info_{country.lower()}.json'
-    
-    # Create CSV
+    # Publish CSV (only if it passes the feed schema validator)
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=unique_data[0].keys())
-            writer.writeheader()
-            writer.writerows(unique_data)
+        writer.close(validate=lambda path: check_feed(path, 'kaufland', locale=config['locale']))
         print(f"✅ Created {filename} with {len(unique_data)} products")
+        print(f"🔁 Changes vs previous run: {writer.changes['added']:,} added, {writer.changes['removed']:,} removed, {writer.changes['price_changed']:,} price, {writer.changes['quantity_changed']:,} quantity")
     except Exception as e:
+        writer.discard()
         print(f"❌ Error creating CSV: {e}")
         return
     
+    # Outcome of every offer, kept for the last runs (python feed_ledger.py explain <feed> <sku>)
+    ledger_report = RejectionLedger(os.getenv('FEED_CACHE_DIR', '.feed_cache'), feed_key).record(index.current, ledger_entries, os.getenv('GITHUB_RUN_ID'))
+    print(f"📒 Rejection ledger: {len(ledger_entries):,} offers recorded ({ledger_report['runs']} runs, {ledger_report['bytes']:,} bytes)")
+    
     files_created = [filename]
     
     # Create info file
     try:
         info_data = {
             "last_updated": datetime.now().isoformat(),
+            "run_seconds": round(time.monotonic() - run_started, 1),
             "product_count": len(unique_data),
             "random_seed": random_seed,
             "validation_stats": validation_stats,
+            "eligibility": eligibility_report,
+            "rejection_ledger": ledger_report,
+            "yield": yield_report(quota_plan, yield_counters),
+            "rate_limit": api.rate_limiter.stats(),
+            "checkpoint": checkpoint.stats(),
+            "json_decoding": decode_stats(),
+            "changes": writer.changes,
+            "output_validation": writer.validation,
+            "output_shards": writer.sharding,
+            "image_check": writer.image_check,
+            "description_cache": description_cache.stats(),
+            "selection": execution.pop('selection', None),
+            "execution": execution,
+            "time_budget": budget.report() if budget else None,
+            "taxonomy_yield": merge_taxonomy_yield(taxonomy_history, yield_counters),
             "stock_validation_enabled": True,
             "max_price_filter": max_price_limit,
             "min_price_filter": min_price_limit, 
@@ -727,6 +1115,15 @@ def main():
         print(f"✅ Created {info_filename}")
     except Exception as e:
         print(f"❌ Error creating JSON: {e}")
+        info_data = None
+    
+    # Stats and timings of every run, appended (python feed_history.py report)
+    if info_data:
+        try:
+            run_entry = record_run(os.getenv('FEED_STATE_DIR', 'feed_state'), feed_key, info_data)
+            print(f"📈 Run history: {run_entry['seconds']}s, {run_entry['requests'] or 0:,} requests recorded")
+        except Exception as e:
+            print(f"⚠️ Could not record run history: {e}")
     
     # Create HTML page
     try:
@@ -754,6 +1151,9 @@ def main():
         except Exception as e2:
             print(f"❌ Even fallback HTML failed: {e2}")
     
+    # Files are published, the fetch checkpoint is no longer needed
+    checkpoint.clear()
+    
     # Final summary
     print("\n" + "=" * 70)
     print("🎉 SUCCESS! KAUFLAND FEED GENERATED WITH STOCK VALIDATION")
@@ -0,0 +1,81 @@
+import os
+import statistics
+import time
+
+# Fetch estimate for a taxonomy never timed before (when no other taxonomy has history either)
+DEFAULT_FETCH_SECONDS = 30.0
+# Share of the budget kept for validation, output files and the commit step
+RESERVE_FRACTION = 0.1
+MIN_RESERVE_SECONDS = 60
+
+class RunBudget:
+    """Wall-clock budget for one run, started when the generator starts"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.reserve_seconds = max(MIN_RESERVE_SECONDS, seconds * RESERVE_FRACTION)
+        self.started = time.monotonic()
+        self.planned = 0
+        self.skipped = 0
+        self.estimated_seconds = 0.0
+        self.stopped_early = False
+
+    @classmethod
+    def from_env(cls):
+        """Budget from FEED_TIME_BUDGET (minutes), or None when unset"""
+        minutes = os.getenv('FEED_TIME_BUDGET')
+        if not minutes:
+            return None
+        return cls(float(minutes) * 60)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return self.seconds - self.elapsed()
+
+    def exhausted(self):
+        """True once only the reserve is left; the run should stop fetching and publish"""
+        if self.remaining() <= self.reserve_seconds:
+            if not self.stopped_early:
+                print(f"⏱️ Time budget reached after {self.elapsed():.0f}s, publishing what is validated so far")
+            self.stopped_early = True
+        return self.stopped_early
+
+    def estimate(self, taxonomies, history):
+        """Expected fetch seconds per taxonomy id, from the previous runs' telemetry"""
+        known = [entry['fetch_seconds'] for entry in history.values() if entry.get('fetch_seconds')]
+        fallback = statistics.median(known) if known else DEFAULT_FETCH_SECONDS
+        return {
+            str(taxonomy['id']): history.get(str(taxonomy['id']), {}).get('fetch_seconds') or fallback
+            for taxonomy in taxonomies
+        }
+
+    def plan(self, taxonomies, history):
+        """Keep the taxonomies (in order) whose estimated fetch time fits in the remaining budget"""
+        estimates = self.estimate(taxonomies, history)
+        available = self.remaining() - self.reserve_seconds
+        selected = []
+        for taxonomy in taxonomies:
+            cost = estimates[str(taxonomy['id'])]
+            if selected and self.estimated_seconds + cost > available:
+                continue
+            selected.append(taxonomy)
+            self.estimated_seconds += cost
+        self.planned = len(selected)
+        self.skipped = len(taxonomies) - len(selected)
+        print(f"⏱️ Time budget {self.seconds / 60:.0f} min: {self.planned} categories planned (~{self.estimated_seconds:.0f}s fetch), {self.skipped} skipped")
+        return selected
+
+    def report(self):
+        """Budget usage for the info JSON"""
+        used = self.elapsed()
+        return {
+            'budget_seconds': round(self.seconds),
+            'used_seconds': round(used, 1),
+            'used_fraction': round(used / self.seconds, 3),
+            'planned_taxonomies': self.planned,
+            'skipped_taxonomies': self.skipped,
+            'estimated_fetch_seconds': round(self.estimated_seconds, 1),
+            'stopped_early': self.stopped_early,
+        }
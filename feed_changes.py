@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+def row_hash(row, fieldnames):
+    """Short stable hash of a CSV row (values in column order)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for field in fieldnames:
+        digest.update(str(row.get(field, '')).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+class RowIndex:
+    """Persisted index of a published feed: offer key -> [row hash, price, quantity].
+
+    The index of the previous run is loaded from state_dir/<feed_key>.index.json.
+    Rows of this run are added as they are written; publish() compares both
+    in one pass and writes <feed_key>.changes.json (added / removed /
+    price_changed / quantity_changed / updated) next to the new index.
+    """
+
+    def __init__(self, state_dir, feed_key, fieldnames, key_field, price_field, quantity_field='quantity'):
+        self.index_path = os.path.join(state_dir, f"{feed_key}.index.json")
+        self.changes_path = os.path.join(state_dir, f"{feed_key}.changes.json")
+        self.fieldnames = fieldnames
+        self.key_field = key_field
+        self.price_field = price_field
+        self.quantity_field = quantity_field
+        self.previous, self.previous_generated_at = self._load()
+        self.current = {}
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            return data.get('offers', {}), data.get('generated_at')
+        except FileNotFoundError:
+            return {}, None
+        except Exception as e:
+            print(f"⚠️ Unreadable offer index, every offer will be reported as added: {e}")
+            return {}, None
+
+    def add(self, row):
+        key = str(row.get(self.key_field))
+        self.current[key] = [row_hash(row, self.fieldnames), row.get(self.price_field), row.get(self.quantity_field)]
+
+    def changes(self):
+        """Offer-level delta against the previous run"""
+        added = []
+        price_changed = []
+        quantity_changed = []
+        updated = []
+        for key, (digest, price, quantity) in self.current.items():
+            previous = self.previous.get(key)
+            if previous is None:
+                added.append(key)
+                continue
+            if previous[0] == digest:
+                continue
+            if previous[1] != price:
+                price_changed.append({'key': key, 'old': previous[1], 'new': price})
+            if previous[2] != quantity:
+                quantity_changed.append({'key': key, 'old': previous[2], 'new': quantity})
+            if previous[1] == price and previous[2] == quantity:
+                updated.append(key)
+        removed = [key for key in self.previous if key not in self.current]
+        return {
+            'added': added,
+            'removed': removed,
+            'price_changed': price_changed,
+            'quantity_changed': quantity_changed,
+            'updated': updated,
+        }
+
+    def publish(self):
+        """Write the change log and replace the index; returns the change counts"""
+        changes = self.changes()
+        generated_at = datetime.now().isoformat()
+        counts = {name: len(entries) for name, entries in changes.items()}
+        counts['unchanged'] = len(self.current) - counts['added'] - len(
+            {c['key'] for c in changes['price_changed']} | {c['key'] for c in changes['quantity_changed']} | set(changes['updated'])
+        )
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        self._write_json(self.changes_path, {
+            'generated_at': generated_at,
+            'previous_generated_at': self.previous_generated_at,
+            'key_field': self.key_field,
+            'counts': counts,
+            **changes,
+        })
+        # One offer per line keeps git deltas of the committed index small
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('{"generated_at": %s, "key_field": %s, "offers": {' % (json.dumps(generated_at), json.dumps(self.key_field)))
+            for i, key in enumerate(sorted(self.current)):
+                f.write(('\n' if i == 0 else ',\n') + json.dumps(key) + ': ' + json.dumps(self.current[key]))
+            f.write('\n}}\n')
+        os.replace(tmp_path, self.index_path)
+        return counts
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
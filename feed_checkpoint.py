@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+import shutil
+import time
+
+from feed_json import loads, dumps
+
+# Stock moves fast: a resumed run refetches stock older than this
+STOCK_TTL_SECONDS = 60 * 60
+# Catalog data (products, info, images, variations) and the taxonomy selection
+STATIC_TTL_SECONDS = 12 * 60 * 60
+STOCK_ENDPOINTS = ('stock', 'variations_stock')
+# Payloads fetched in the feed's language
+LOCALIZED_ENDPOINTS = ('info', 'attributes')
+
+class FetchCheckpoint:
+    """Checkpoint of completed (taxonomy, endpoint) payloads so an interrupted fetch phase can resume.
+
+    Payloads are stored gzipped under work_dir/run_key with a manifest.json
+    listing completed units. A manifest written for a different run_key or
+    older than STATIC_TTL_SECONDS is discarded, as are stock units older than
+    STOCK_TTL_SECONDS.
+    """
+
+    def __init__(self, work_dir, run_key):
+        self.run_key = run_key
+        self.directory = os.path.join(work_dir, run_key)
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.manifest = self._load_manifest()
+        self.resumed_units = 0
+        self.fetched_units = 0
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('run_key') == self.run_key and time.time() - manifest.get('created_at', 0) < STATIC_TTL_SECONDS:
+                completed = len(manifest.get('units', {}))
+                print(f"♻️ Resuming fetch from checkpoint: {completed} completed units in {self.directory}")
+                return manifest
+            print(f"🗑️ Discarding stale checkpoint in {self.directory}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Unreadable checkpoint manifest, starting over: {e}")
+        shutil.rmtree(self.directory, ignore_errors=True)
+        return {'run_key': self.run_key, 'created_at': time.time(), 'taxonomies': None, 'units': {}}
+
+    def _write_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def taxonomies(self, fetcher):
+        """Taxonomy selection of the interrupted run, or a fresh one from fetcher"""
+        if self.manifest.get('taxonomies'):
+            return self.manifest['taxonomies']
+        taxonomies = fetcher()
+        if taxonomies:
+            self.manifest['taxonomies'] = taxonomies
+            self._write_manifest()
+        return taxonomies
+
+    def load(self, tax_id, endpoint):
+        """Checkpointed payload for a unit, or None if missing or expired"""
+        unit = self.manifest['units'].get(f"{tax_id}:{endpoint}")
+        if not unit:
+            return None
+        if endpoint in STOCK_ENDPOINTS and time.time() - unit['saved_at'] > STOCK_TTL_SECONDS:
+            return None
+        try:
+            with gzip.open(os.path.join(self.directory, unit['file']), 'rb') as f:
+                return loads(f.read())
+        except Exception as e:
+            print(f"⚠️ Corrupt checkpoint {tax_id}:{endpoint}, refetching: {e}")
+            return None
+
+    def save(self, tax_id, endpoint, payload):
+        """Persist a completed unit and record it in the manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{tax_id}_{endpoint}.json.gz"
+        tmp_path = os.path.join(self.directory, file_name + '.tmp')
+        with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+            f.write(dumps(payload))
+        os.replace(tmp_path, os.path.join(self.directory, file_name))
+        self.manifest['units'][f"{tax_id}:{endpoint}"] = {
+            'file': file_name,
+            'saved_at': time.time(),
+            'records': len(payload) if isinstance(payload, list) else None,
+        }
+        self._write_manifest()
+
+    def fetch(self, tax_id, endpoint, fetcher):
+        """Return the checkpointed payload or call fetcher and checkpoint its result"""
+        payload = self.load(tax_id, endpoint)
+        if payload is not None:
+            self.resumed_units += 1
+            return payload
+        payload = fetcher()
+        if payload is not None:
+            self.save(tax_id, endpoint, payload)
+            self.fetched_units += 1
+        return payload
+
+    def clear(self):
+        """Drop the checkpoint once the run has published its files"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self):
+        return {'resumed_units': self.resumed_units, 'fetched_units': self.fetched_units}
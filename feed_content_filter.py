@@ -0,0 +1,63 @@
+import re
+
+# First-level taxonomy names that mark a whole category as adult (substring match)
+ADULT_TAXONOMY_KEYWORDS = ['erotic', 'erotico', 'adult', 'sex', 'sexy', 'intimate', 'lingerie', 'sensualidad']
+
+# Adult product terms matched at the start of a word in product names and
+# descriptions: BigBuy source languages (es, en) and feed languages (it, de, sk, cs, pl).
+# Stems are chosen so that everyday words ("per adulti", "vibratore per calcestruzzo")
+# are not caught.
+ADULT_PRODUCT_TERMS = [
+    # es / en
+    'erotic', 'erótic', 'sexy', 'sexual', 'sex toy', 'sextoy', 'sex shop', 'sexshop',
+    'dildo', 'consolador', 'masturb', 'porn', 'bdsm', 'bondage', 'fetish', 'kamasutra',
+    'sensualidad', 'lubricante íntimo', 'anal plug', 'plug anal', 'strap-on', 'strapon',
+    # it
+    'erotich', 'sessual', 'feticis', 'lubrificante intimo',
+    # de
+    'erotik', 'erotisch', 'sexuell', 'sexspielzeug', 'fetisch', 'liebeskugel', 'gleitgel', 'analplug',
+    # sk / cs
+    'erotick', 'sexuáln', 'fetiš',
+    # pl
+    'erotyczn', 'seks', 'fetysz',
+]
+
+def _trie_pattern(node):
+    alternatives = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ''
+    pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    return f"(?:{pattern})?" if '' in node else pattern
+
+def compile_keywords(keywords, word_start=False):
+    """One regex matching any keyword in lowercased text.
+
+    Keywords are folded into a prefix trie so the engine dispatches on one
+    character at a time instead of trying every keyword at every position;
+    this is several times faster than a plain alternation with IGNORECASE.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}
+    prefix = r'\b' if word_start else ''
+    return re.compile(prefix + _trie_pattern(trie))
+
+ADULT_TAXONOMY_PATTERN = compile_keywords(ADULT_TAXONOMY_KEYWORDS)
+ADULT_PRODUCT_PATTERN = compile_keywords(ADULT_PRODUCT_TERMS, word_start=True)
+
+def is_adult_taxonomy(name):
+    """True if a taxonomy name marks an adult category"""
+    return ADULT_TAXONOMY_PATTERN.search((name or '').lower()) is not None
+
+def adult_content_match(info):
+    """First adult term found in a productsinformation record (name, then description), or None"""
+    for field in ('name', 'description'):
+        text = info.get(field)
+        if text:
+            match = ADULT_PRODUCT_PATTERN.search(text.lower())
+            if match:
+                return match.group(0)
+    return None
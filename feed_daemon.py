@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bigbuy_kaufland
+import bigbuy_manomano
+from feed_checkpoint import STOCK_ENDPOINTS, LOCALIZED_ENDPOINTS
+from feed_server import start_feed_server
+from kaufland_push import push_changes
+
+# Language of the productsinformation payload each Kaufland storefront uses
+KAUFLAND_LANGUAGES = {'IT': 'it', 'DE': 'de', 'AT': 'de', 'PL': 'pl', 'SK': 'sk', 'CZ': 'cs'}
+DEFAULT_FEEDS = 'kaufland:it=360,kaufland:de=1440,kaufland:at=1440,kaufland:pl=1440,kaufland:sk=1440,kaufland:cz=1440,manomano=360'
+
+class WarmCatalog:
+    """(taxonomy, endpoint) payloads kept in memory and shared by every feed.
+
+    Stock and static (products, variations, info, images) payloads expire on
+    separate TTLs; refresh() refetches entries nearing expiry in the
+    background so builds are served from memory.
+    """
+
+    def __init__(self, stock_ttl, static_ttl):
+        self.stock_ttl = stock_ttl
+        self.static_ttl = static_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.refreshes = {'stock': 0, 'static': 0}
+        self.last_refresh = {'stock': None, 'static': None}
+
+    def kind(self, endpoint):
+        return 'stock' if endpoint in STOCK_ENDPOINTS else 'static'
+
+    def ttl(self, endpoint):
+        return self.stock_ttl if self.kind(endpoint) == 'stock' else self.static_ttl
+
+    def get(self, key, endpoint, fetcher):
+        """Cached payload, or fetch it (True as second value when served from memory)"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and time.time() - entry['fetched_at'] < self.ttl(endpoint):
+            self.hits += 1
+            return entry['payload'], True
+        payload = fetcher()
+        if payload is not None:
+            with self.lock:
+                self.entries[key] = {'payload': payload, 'fetched_at': time.time(), 'endpoint': endpoint, 'fetcher': fetcher}
+            self.fetches += 1
+        return payload, False
+
+    def refresh(self, kind, margin=0.8):
+        """Refetch entries of one kind older than margin x their TTL"""
+        now = time.time()
+        with self.lock:
+            due = [
+                (key, entry) for key, entry in self.entries.items()
+                if self.kind(entry['endpoint']) == kind and now - entry['fetched_at'] >= self.ttl(entry['endpoint']) * margin
+            ]
+        for key, entry in due:
+            payload = entry['fetcher']()
+            if payload is not None:
+                with self.lock:
+                    self.entries[key] = dict(entry, payload=payload, fetched_at=time.time())
+                self.refreshes[kind] += 1
+        self.last_refresh[kind] = datetime.now().isoformat()
+        return len(due)
+
+    def view(self, feed_key, language, work_dir):
+        return CatalogView(self, feed_key, language, work_dir)
+
+    def stats(self):
+        with self.lock:
+            entries = list(self.entries.values())
+        now = time.time()
+        return {
+            'entries': len(entries),
+            'stock_entries': sum(1 for e in entries if self.kind(e['endpoint']) == 'stock'),
+            'oldest_stock_seconds': round(max((now - e['fetched_at'] for e in entries if self.kind(e['endpoint']) == 'stock'), default=0)),
+            'oldest_static_seconds': round(max((now - e['fetched_at'] for e in entries if self.kind(e['endpoint']) == 'static'), default=0)),
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'refreshes': self.refreshes,
+            'last_refresh': self.last_refresh,
+        }
+
+class CatalogView:
+    """FetchCheckpoint-compatible view of the warm catalog for one feed"""
+
+    def __init__(self, catalog, feed_key, language, work_dir):
+        self.catalog = catalog
+        self.feed_key = feed_key
+        self.language = language
+        self.directory = os.path.join(work_dir, 'daemon', feed_key)
+        self.selection = None
+        self.selected_at = 0
+        self.resumed_units = 0
+        self.fetched_units = 0
+
+    def taxonomies(self, fetcher):
+        """The feed's taxonomy selection, redrawn once static data expires"""
+        if not self.selection or time.time() - self.selected_at >= self.catalog.static_ttl:
+            self.selection = fetcher()
+            self.selected_at = time.time()
+        return self.selection
+
+    def fetch(self, tax_id, endpoint, fetcher):
+        # Descriptions and attribute names are per language, everything else is shared by all feeds
+        key = f"{tax_id}:{endpoint}:{self.language}" if endpoint in LOCALIZED_ENDPOINTS else f"{tax_id}:{endpoint}"
+        payload, warm = self.catalog.get(key, endpoint, fetcher)
+        if warm:
+            self.resumed_units += 1
+        elif payload is not None:
+            self.fetched_units += 1
+        return payload
+
+    def clear(self):
+        """Nothing to drop: the catalog stays warm for the next build"""
+        self.resumed_units = 0
+        self.fetched_units = 0
+
+    def stats(self):
+        return {'resumed_units': self.resumed_units, 'fetched_units': self.fetched_units, 'warm': True}
+
+def parse_feeds(spec):
+    """Feeds from 'kaufland:it=360,manomano=360' (build interval in minutes)"""
+    feeds = []
+    for item in spec.split(','):
+        name, _, minutes = item.strip().partition('=')
+        marketplace, _, country = name.partition(':')
+        if marketplace == 'kaufland':
+            country = country.upper() or 'IT'
+            info_file = 'feed_info.json' if country == 'IT' else f'feed_info_{country.lower()}.json'
+            feeds.append({'name': f"kaufland_{country.lower()}", 'marketplace': marketplace, 'country': country,
+                          'language': KAUFLAND_LANGUAGES[country], 'info_file': info_file})
+        elif marketplace == 'manomano':
+            feeds.append({'name': 'manomano_it', 'marketplace': marketplace, 'country': 'IT',
+                          'language': 'it', 'info_file': 'manomano_feed_info.json'})
+        else:
+            raise ValueError(f"Unknown marketplace in FEED_DAEMON_FEEDS: {item}")
+        feeds[-1]['interval'] = float(minutes or 360) * 60
+    return feeds
+
+def file_version(path):
+    """Modification time of path (ns), or None when it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+class FeedDaemon:
+    """Regenerates every feed on its own cadence from a warm in-memory catalog"""
+
+    def __init__(self, feeds, stock_minutes=15, static_minutes=360, port=8787):
+        self.feeds = feeds
+        self.port = port
+        self.started_at = time.time()
+        self.catalog = WarmCatalog(stock_minutes * 60, static_minutes * 60)
+        api_key = os.getenv('BIGBUY_API_KEY')
+        # One session and one rate limiter for every feed and the refresher
+        self.kaufland_api = bigbuy_kaufland.BigBuyAPI(api_key)
+        self.manomano_api = bigbuy_manomano.BigBuyAPI(api_key)
+        self.manomano_api.session = self.kaufland_api.session
+        self.manomano_api.rate_limiter = self.kaufland_api.rate_limiter
+        work_dir = os.getenv('FEED_WORK_DIR', '.feed_work')
+        self.status = {}
+        for feed in feeds:
+            feed['view'] = self.catalog.view(feed['name'], feed['language'], work_dir)
+            self.status[feed['name']] = {'interval_seconds': feed['interval'], 'next_due': time.time(), 'builds': 0,
+                                         'last_started': None, 'last_seconds': None, 'last_error': None, 'product_count': None, 'published': None, 'push': None}
+        self.building = None
+        self.stop_event = threading.Event()
+
+    def build(self, feed):
+        status = self.status[feed['name']]
+        self.building = feed['name']
+        started = time.monotonic()
+        status['last_started'] = datetime.now().isoformat()
+        info_before = file_version(feed['info_file'])
+        try:
+            if feed['marketplace'] == 'kaufland':
+                bigbuy_kaufland.main(country=feed['country'], api=self.kaufland_api, catalog=feed['view'])
+                # Price and stock changes reach Kaufland now instead of at its next CSV poll
+                status['push'] = push_changes(feed['country'], os.getenv('FEED_STATE_DIR', 'feed_state'), os.getenv('FEED_CACHE_DIR', '.feed_cache'))
+            else:
+                bigbuy_manomano.main(api=self.manomano_api, catalog=feed['view'])
+            status['last_error'] = None
+            # main() returns early without publishing (the info file is then the previous build's)
+            status['published'] = file_version(feed['info_file']) not in (None, info_before)
+            status['product_count'] = 0
+            if status['published']:
+                with open(feed['info_file'], 'r') as f:
+                    status['product_count'] = json.load(f).get('product_count')
+        except Exception as e:
+            traceback.print_exc()
+            status['last_error'] = str(e)
+            status['published'] = False
+            status['product_count'] = 0
+        status['last_seconds'] = round(time.monotonic() - started, 1)
+        status['builds'] += 1
+        status['next_due'] = time.time() + feed['interval']
+        self.building = None
+        print(f"🏁 {feed['name']} built in {status['last_seconds']}s")
+
+    def _refresh_loop(self):
+        intervals = {'stock': self.catalog.stock_ttl, 'static': self.catalog.static_ttl}
+        next_run = {kind: time.time() + seconds / 2 for kind, seconds in intervals.items()}
+        while not self.stop_event.wait(10):
+            for kind, seconds in intervals.items():
+                if time.time() >= next_run[kind]:
+                    refreshed = self.catalog.refresh(kind)
+                    print(f"🔄 Refreshed {refreshed} {kind} payloads")
+                    next_run[kind] = time.time() + seconds / 2
+
+    def snapshot(self):
+        return {
+            'uptime_seconds': round(time.time() - self.started_at),
+            'building': self.building,
+            'catalog': self.catalog.stats(),
+            'rate_limit': self.kaufland_api.rate_limiter.stats(),
+            'feeds': {
+                name: dict(status, next_due=datetime.fromtimestamp(status['next_due']).isoformat())
+                for name, status in self.status.items()
+            },
+        }
+
+    def _serve_status(self):
+        daemon = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/status'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(daemon.snapshot(), indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', self.port), StatusHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📡 Status on http://127.0.0.1:{self.port}/status")
+        return server
+
+    def run_forever(self):
+        server = self._serve_status()
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        try:
+            while not self.stop_event.is_set():
+                due = [feed for feed in self.feeds if self.status[feed['name']]['next_due'] <= time.time()]
+                if due:
+                    self.build(min(due, key=lambda feed: self.status[feed['name']]['next_due']))
+                else:
+                    self.stop_event.wait(5)
+        except KeyboardInterrupt:
+            print("👋 Stopping feed daemon")
+        finally:
+            self.stop_event.set()
+            server.shutdown()
+
+def main():
+    if not os.getenv('BIGBUY_API_KEY'):
+        print("❌ No API key found in BIGBUY_API_KEY environment variable")
+        return
+    feeds = parse_feeds(os.getenv('FEED_DAEMON_FEEDS', DEFAULT_FEEDS))
+    daemon = FeedDaemon(
+        feeds,
+        stock_minutes=float(os.getenv('FEED_DAEMON_STOCK_MINUTES', '15')),
+        static_minutes=float(os.getenv('FEED_DAEMON_STATIC_MINUTES', '360')),
+        port=int(os.getenv('FEED_DAEMON_PORT', '8787')),
+    )
+    print(f"🛰️ Feed daemon: {', '.join(feed['name'] for feed in feeds)}")
+    if os.getenv('FEED_SERVER_PORT'):
+        start_feed_server('.', os.getenv('FEED_SERVER_HOST', '127.0.0.1'), int(os.getenv('FEED_SERVER_PORT')))
+    daemon.run_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+# Runs kept per feed; the file is trimmed back to this once it grows a quarter past it
+HISTORY_RUNS = 1000
+# Metric -> (direction, ratio against the baseline median, smallest latest value that can regress)
+REGRESSION_RULES = {
+    'seconds': ('up', 1.5, 60),
+    'requests': ('up', 1.5, 50),
+    'throttled_responses': ('up', 2.0, 10),
+    'products': ('down', 0.7, 0),
+}
+# A rejection reason regresses when its share of processed offers doubles (and is at least this share)
+REJECTION_RATIO = 2.0
+REJECTION_MIN_SHARE = 0.02
+# Runs needed before a metric is compared against its baseline
+MIN_BASELINE_RUNS = 3
+
+def run_summary(feed_key, info):
+    """Compact history entry from a run's info JSON"""
+    stats = info.get('validation_stats', {})
+    rate = info.get('rate_limit') or {}
+    execution = info.get('execution') or {}
+    changes = info.get('changes') or {}
+    counters = ('total_processed', 'valid_products')
+    return {
+        'at': info.get('last_updated'),
+        'run_id': os.getenv('GITHUB_RUN_ID'),
+        'feed': feed_key,
+        'mode': execution.get('mode'),
+        'seconds': info.get('run_seconds'),
+        'pipeline_seconds': execution.get('wall_seconds'),
+        'products': info.get('product_count'),
+        'processed': stats.get('total_processed'),
+        'valid': stats.get('valid_products'),
+        'rejections': {reason: count for reason, count in stats.items() if reason not in counters and isinstance(count, int) and count},
+        'requests': rate.get('requests'),
+        'throttled_responses': rate.get('throttled_responses'),
+        'throttled_seconds': rate.get('throttled_seconds'),
+        'changes': {name: changes.get(name) for name in ('added', 'removed', 'price_changed', 'quantity_changed')},
+        'dead_images': (info.get('image_check') or {}).get('dead'),
+    }
+
+class RunHistory:
+    """Append-only run history of a feed in state_dir/<feed_key>.history.jsonl (one JSON object per run)"""
+
+    def __init__(self, state_dir, feed_key, keep=HISTORY_RUNS):
+        self.feed_key = feed_key
+        self.path = os.path.join(state_dir, f"{feed_key}.history.jsonl")
+        self.keep = keep
+
+    def append(self, entry):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':'), sort_keys=True) + '\n')
+        self._rotate()
+
+    def _rotate(self):
+        with open(self.path, 'r') as f:
+            lines = f.readlines()
+        if len(lines) <= self.keep + self.keep // 4:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(lines[-self.keep:])
+        os.replace(tmp_path, self.path)
+
+    def runs(self, last=None):
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        runs = []
+        for line in lines[-last:] if last else lines:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                # (a line cut short by an interrupted run)
+                continue
+        return runs
+
+def record_run(state_dir, feed_key, info):
+    """Append a run's info JSON to its feed history; returns the entry"""
+    entry = run_summary(feed_key, info)
+    RunHistory(state_dir, feed_key).append(entry)
+    return entry
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+def rejection_shares(run):
+    processed = run.get('processed') or 0
+    if processed <= 0:
+        return {}
+    return {reason: count / processed for reason, count in (run.get('rejections') or {}).items()}
+
+def find_regressions(runs):
+    """Regressions of the latest run against the median of the runs before it"""
+    if len(runs) < MIN_BASELINE_RUNS + 1:
+        return []
+    latest, baseline = runs[-1], runs[:-1]
+    regressions = []
+    for metric, (direction, ratio, floor) in REGRESSION_RULES.items():
+        values = [run[metric] for run in baseline if run.get(metric) is not None]
+        if len(values) < MIN_BASELINE_RUNS or latest.get(metric) is None:
+            continue
+        median = percentile(values, 0.5)
+        change = f"{latest[metric] / median - 1:+.0%}" if median else 'from 0'
+        if direction == 'up' and latest[metric] >= floor and latest[metric] > median * ratio:
+            regressions.append(f"{metric} {latest[metric]:,} vs median {median:,} ({change})")
+        elif direction == 'down' and median > 0 and latest[metric] < median * ratio:
+            regressions.append(f"{metric} {latest[metric]:,} vs median {median:,} ({change})")
+    shares = rejection_shares(latest)
+    baseline_shares = [rejection_shares(run) for run in baseline]
+    for reason, share in sorted(shares.items()):
+        median = percentile([entry.get(reason, 0.0) for entry in baseline_shares], 0.5)
+        if share >= REJECTION_MIN_SHARE and share >= median * REJECTION_RATIO:
+            regressions.append(f"{reason} {share:.1%} of processed vs median {median:.1%}")
+    return regressions
+
+def print_report(feed_key, runs):
+    """Trend table of one feed; returns its regressions"""
+    if not runs:
+        print(f"❓ {feed_key}: no runs recorded")
+        return []
+    print(f"\n📈 {feed_key}: {len(runs)} run(s), {(runs[0].get('at') or '?')[:16]} → {(runs[-1].get('at') or '?')[:16]}")
+    print(f"   {'metric':<22}{'last':>10}{'p50':>10}{'p90':>10}{'min':>10}{'max':>10}")
+    for metric in ('seconds', 'pipeline_seconds', 'requests', 'throttled_responses', 'processed', 'valid', 'products', 'dead_images'):
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        if not values:
+            continue
+        last = runs[-1].get(metric)
+        cells = [last if last is not None else '-', percentile(values, 0.5), percentile(values, 0.9), min(values), max(values)]
+        print(f"   {metric:<22}" + ''.join(f"{cell:>10,.0f}" if isinstance(cell, (int, float)) else f"{cell:>10}" for cell in cells))
+    shares = rejection_shares(runs[-1])
+    if shares:
+        history = [rejection_shares(run) for run in runs]
+        mix = ', '.join(
+            f"{reason} {share:.1%} (p50 {percentile([entry.get(reason, 0.0) for entry in history], 0.5):.1%})"
+            for reason, share in sorted(shares.items(), key=lambda item: -item[1])
+        )
+        print(f"   rejection mix: {mix}")
+    regressions = find_regressions(runs)
+    for regression in regressions:
+        print(f"   ⚠️ Regression: {regression}")
+    if not regressions:
+        print("   ✅ No regressions against the previous runs")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run history trends and regressions per feed')
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('--feed', action='append', help='feed key (default: every feed with a history)')
+    parser.add_argument('--last', type=int, default=30, help='runs per feed in the report')
+    parser.add_argument('--state-dir', default=os.getenv('FEED_STATE_DIR', 'feed_state'))
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 when a regression is found')
+    args = parser.parse_args()
+    feeds = args.feed or sorted(
+        os.path.basename(path)[:-len('.history.jsonl')] for path in glob.glob(os.path.join(args.state_dir, '*.history.jsonl'))
+    )
+    if not feeds:
+        print(f"❓ No run history in {args.state_dir}")
+        return 0
+    regressions = 0
+    for feed_key in feeds:
+        regressions += len(print_report(feed_key, RunHistory(args.state_dir, feed_key).runs(args.last)))
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# A live image is rechecked after a week, a dead one after a day (CDNs come back)
+LIVE_TTL_SECONDS = 7 * 24 * 60 * 60
+DEAD_TTL_SECONDS = 24 * 60 * 60
+# Statuses that mean the image is gone; anything else that is not 2xx/3xx is inconclusive
+DEAD_STATUSES = {404, 410}
+IMAGE_CHECK_MODES = ('off', 'flag', 'drop')
+# Result of a URL left unprobed because the time budget ran out
+_SKIPPED = object()
+
+class ImageVerifier:
+    """Checks the image URLs of feed rows before publish.
+
+    URLs are checked with concurrent HEAD requests (GET of the first byte
+    when HEAD is refused), at most per_host at a time on any host. Results
+    are cached by URL in cache_dir with a TTL, so a run only checks new or
+    expired URLs. Timeouts, connection errors and other statuses are
+    inconclusive: the image is kept and rechecked next run.
+
+    mode 'drop' removes dead URLs from the image fields (the live ones move
+    up) and drops offers left without an image; mode 'flag' only reports them.
+    Once budget (a RunBudget) is exhausted, the remaining URLs are left
+    unprobed (inconclusive) so the run can still publish.
+    """
+
+    def __init__(self, fields, key_field, cache_dir, mode='flag', workers=16, per_host=4, timeout=10, budget=None):
+        if mode not in IMAGE_CHECK_MODES or mode == 'off':
+            raise ValueError(f"Unknown image check mode: {mode}")
+        self.fields = fields
+        self.key_field = key_field
+        # Shared by every feed: they list the same BigBuy images
+        self.path = os.path.join(cache_dir, 'image_checks.json')
+        self.budget = budget
+        self.mode = mode
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.results = self._load()
+        self.dirty = False
+        self.host_slots = {}
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=per_host)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.counts = {'urls': 0, 'cached': 0, 'checked': 0, 'skipped': 0, 'live': 0, 'dead': 0, 'inconclusive': 0,
+                       'images_dropped': 0, 'offers_dropped': 0, 'offers_flagged': 0, 'seconds': 0.0}
+        self.flagged = []
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the cache once per run (after the last filter), when probes added results"""
+        if not self.dirty:
+            return
+        # Expired entries are pruned so the cache only holds URLs seen recently
+        now = time.time()
+        self.results = {url: entry for url, entry in self.results.items()
+                        if now - entry[1] < (LIVE_TTL_SECONDS if entry[0] else DEAD_TTL_SECONDS)}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.results, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def _cached(self, url, now):
+        entry = self.results.get(url)
+        if entry and now - entry[1] < (LIVE_TTL_SECONDS if entry[0] else DEAD_TTL_SECONDS):
+            return entry[0]
+        return None
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.Semaphore(self.per_host)
+            return self.host_slots[host]
+
+    def _probe(self, url):
+        """True (live), False (dead) or None (inconclusive)"""
+        with self._slot(url):
+            try:
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+                if response.status_code in (403, 405, 501):
+                    # HEAD not allowed: fetch only the first byte
+                    response = self.session.get(url, timeout=self.timeout, headers={'Range': 'bytes=0-0'}, stream=True)
+                    response.close()
+            except requests.RequestException:
+                return None
+        if response.status_code in DEAD_STATUSES:
+            return False
+        if response.status_code < 400:
+            content_type = response.headers.get('Content-Type', '')
+            # An HTML error page served with 200 is not an image
+            return not content_type.startswith('text/')
+        return None
+
+    def _probe_within_budget(self, url):
+        if self.budget is not None and self.budget.exhausted():
+            return _SKIPPED
+        return self._probe(url)
+
+    def check(self, urls):
+        """url -> True/False/None for a collection of URLs (cache first, the rest probed concurrently)"""
+        now = time.time()
+        status = {}
+        missing = []
+        for url in set(urls):
+            cached = self._cached(url, now)
+            if cached is None:
+                missing.append(url)
+            else:
+                status[url] = cached
+        self.counts['urls'] += len(status) + len(missing)
+        self.counts['cached'] += len(status)
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for url, result in zip(missing, pool.map(self._probe_within_budget, missing)):
+                    if result is _SKIPPED:
+                        status[url] = None
+                        self.counts['skipped'] += 1
+                        continue
+                    status[url] = result
+                    self.counts['checked'] += 1
+                    if result is not None:
+                        self.results[url] = [result, now]
+                        self.dirty = True
+        return status
+
+    def filter(self, rows):
+        """rows with dead images handled according to mode (offers without a live image are dropped)"""
+        started = time.monotonic()
+        status = self.check(row[field] for row in rows for field in self.fields if row.get(field))
+        for result in status.values():
+            self.counts['live' if result else 'dead' if result is False else 'inconclusive'] += 1
+        kept = []
+        for row in rows:
+            urls = [row[field] for field in self.fields if row.get(field)]
+            live = [url for url in urls if status[url] is not False]
+            if len(live) == len(urls):
+                kept.append(row)
+                continue
+            if self.mode == 'flag':
+                self.counts['offers_flagged'] += 1
+                if len(self.flagged) < 100:
+                    self.flagged.append({'key': row.get(self.key_field),
+                                         'dead': [url for url in urls if status[url] is False]})
+                kept.append(row)
+                continue
+            self.counts['images_dropped'] += len(urls) - len(live)
+            if not live:
+                self.counts['offers_dropped'] += 1
+                continue
+            for i, field in enumerate(self.fields):
+                row[field] = live[i] if i < len(live) else ''
+            kept.append(row)
+        self.counts['seconds'] += time.monotonic() - started
+        return kept
+
+    def report(self):
+        report = {'mode': self.mode, **self.counts, 'seconds': round(self.counts['seconds'], 1)}
+        if self.flagged:
+            report['flagged'] = self.flagged
+        return report
+
+def image_verifier_from_env(fields, key_field, budget=None):
+    """ImageVerifier configured from FEED_IMAGE_CHECK (off by default, flag or drop) and friends, or None when off.
+
+    The cache directory (FEED_IMAGE_CACHE_DIR) is separate from the per-feed
+    caches so that every feed's workflow shares one set of results.
+    """
+    mode = os.getenv('FEED_IMAGE_CHECK', 'off').lower()
+    if mode not in IMAGE_CHECK_MODES:
+        raise ValueError(f"FEED_IMAGE_CHECK must be one of {', '.join(IMAGE_CHECK_MODES)}, not {mode!r}")
+    if mode == 'off':
+        return None
+    return ImageVerifier(
+        fields,
+        key_field,
+        os.getenv('FEED_IMAGE_CACHE_DIR', '.feed_images'),
+        mode=mode,
+        budget=budget,
+        workers=int(os.getenv('FEED_IMAGE_WORKERS', '16')),
+        per_host=int(os.getenv('FEED_IMAGE_PER_HOST', '4')),
+        timeout=float(os.getenv('FEED_IMAGE_TIMEOUT', '10')),
+    )
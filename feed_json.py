@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    # (stdlib fallback: same results, slower decoding)
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+# Endpoint -> fields kept from each record; nested lists map to the fields kept from their items
+PROJECTIONS = {
+    'products': {'id': None, 'sku': None, 'ean13': None, 'wholesalePrice': None, 'condition': None,
+                 'weight': None, 'width': None, 'height': None, 'depth': None, 'taxonomy': None},
+    'variations': {'id': None, 'product': None, 'sku': None, 'ean13': None, 'wholesalePrice': None, 'extraWeight': None,
+                   'width': None, 'height': None, 'depth': None, 'attributes': ('id',)},
+    'stock': {'sku': None, 'stocks': ('quantity',)},
+    'variations_stock': {'sku': None, 'stocks': ('quantity',)},
+    'info': {'sku': None, 'name': None, 'description': None},
+    'images': {'id': None, 'images': ('url',)},
+    'attributes': {'id': None, 'attributeGroup': None, 'name': None},
+    'attribute_groups': {'id': None, 'name': None},
+    'taxonomies': {'id': None, 'name': None, 'parentTaxonomy': None},
+}
+
+_stats_lock = threading.Lock()
+_stats = {'responses': 0, 'bytes': 0, 'records': 0, 'seconds': 0.0}
+
+def loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def dumps(data):
+    """Compact JSON as bytes"""
+    return orjson.dumps(data) if orjson else json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _project_record(record, fields):
+    projected = {}
+    for field, item_fields in fields.items():
+        if field not in record:
+            continue
+        value = record[field]
+        if item_fields and isinstance(value, list):
+            value = [{key: item[key] for key in item_fields if key in item} for item in value if isinstance(item, dict)]
+        projected[field] = value
+    return projected
+
+def project(endpoint, payload):
+    """payload's records reduced to the fields the feed reads (unknown endpoints are returned as-is)"""
+    fields = PROJECTIONS.get(endpoint)
+    if fields is None or not isinstance(payload, list):
+        return payload
+    return [_project_record(record, fields) if isinstance(record, dict) else record for record in payload]
+
+def decode_response(content, endpoint=None):
+    """Decode a BigBuy response body, projected onto the fields used for endpoint.
+
+    The full records only live for the duration of the call: what is
+    returned (and checkpointed, and held for the whole run) is the projection.
+    """
+    started = time.perf_counter()
+    payload = project(endpoint, loads(content))
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        _stats['responses'] += 1
+        _stats['bytes'] += len(content)
+        _stats['records'] += len(payload) if isinstance(payload, list) else 0
+        _stats['seconds'] += elapsed
+    return payload
+
+def decode_stats():
+    with _stats_lock:
+        return {
+            'backend': BACKEND,
+            'responses': _stats['responses'],
+            'megabytes': round(_stats['bytes'] / 1024 / 1024, 1),
+            'records': _stats['records'],
+            'seconds': round(_stats['seconds'], 2),
+        }
@@ -0,0 +1,212 @@
+import argparse
+import base64
+import bisect
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+# Runs kept in a feed's ledger (older runs are dropped when a new one is recorded)
+LEDGER_RUNS = 30
+NOT_PUBLISHED = 'not_published'
+NOT_PROCESSED = 'not_processed'
+
+def encode_bitmap(positions):
+    """Base64 bitmap with the bits of positions set"""
+    positions = list(positions)
+    bits = bytearray((max(positions) // 8 + 1) if positions else 0)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+def bitmap_positions(text):
+    """Set bit positions of an encoded bitmap, in order"""
+    for byte_index, byte in enumerate(base64.b64decode(text)):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield byte_index * 8 + bit
+
+def bitmap_test(bits, position):
+    return position >> 3 < len(bits) and bits[position >> 3] >> (position & 7) & 1
+
+def bitmap_rank(bits, position):
+    """Set bits before position"""
+    head = int.from_bytes(bits[:position >> 3], 'little')
+    partial = bits[position >> 3] & ((1 << (position & 7)) - 1) if position >> 3 < len(bits) else 0
+    return bin(head).count('1') + bin(partial).count('1')
+
+def _compact(value):
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, str):
+        return value[:80]
+    return value
+
+class RejectionLedger:
+    """Outcome of every offer of a feed over its last runs, in cache_dir/<feed_key>.ledger.json.gz.
+
+    The ledger holds one sorted SKU dictionary and, per run, bitmaps over
+    it: published offers, valid offers, and one bitmap per rejection reason
+    with the offending values in SKU order. explain() answers for one SKU
+    with a bisect and a bit test per run. The file is rewritten whole every
+    run, so it lives in the actions cache, not in git (where it would add a
+    full blob per run).
+    """
+
+    def __init__(self, cache_dir, feed_key, keep=LEDGER_RUNS):
+        self.feed_key = feed_key
+        self.path = os.path.join(cache_dir, f"{feed_key}.ledger.json.gz")
+        self.keep = keep
+
+    def load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'feed': self.feed_key, 'skus': [], 'runs': []}
+
+    @staticmethod
+    def _decode_run(skus, run):
+        """(published SKUs, valid SKUs, SKU -> (reason, value)) of a stored run"""
+        def members(text):
+            return [skus[i] for i in bitmap_positions(text)]
+        published = set(members(run['published']))
+        valid = set(members(run['valid']))
+        rejected = {}
+        for reason, entry in run['rejected'].items():
+            for sku, value in zip(members(entry['skus']), entry['values']):
+                rejected[sku] = (reason, value)
+        return published, valid, rejected
+
+    def record(self, published, outcomes, run_id=None):
+        """Add a run: published offer keys and (sku, reason or None when valid, value) outcomes; returns a summary"""
+        ledger = self.load()
+        runs = [
+            (run['run_id'], run['generated_at'], *self._decode_run(ledger['skus'], run))
+            for run in ledger['runs'][-(self.keep - 1):]
+        ] if self.keep > 1 else []
+        valid = set()
+        rejected = {}
+        for sku, reason, value in outcomes:
+            if reason is None:
+                valid.add(str(sku))
+            else:
+                rejected[str(sku)] = (reason, _compact(value))
+        generated_at = datetime.now().isoformat()
+        runs.append((run_id or datetime.now().strftime('%Y%m%dT%H%M%S'), generated_at, {str(sku) for sku in published}, valid, rejected))
+
+        # Dictionary of every SKU still referenced, runs re-encoded against it
+        skus = sorted(set().union(*(published | valid | set(rejected) for _, _, published, valid, rejected in runs)))
+        position = {sku: i for i, sku in enumerate(skus)}
+        encoded = []
+        for run_id, run_at, run_published, run_valid, run_rejected in runs:
+            by_reason = {}
+            for sku, (reason, value) in run_rejected.items():
+                by_reason.setdefault(reason, []).append((position[sku], value))
+            encoded.append({
+                'run_id': run_id,
+                'generated_at': run_at,
+                'published': encode_bitmap(position[sku] for sku in run_published),
+                'valid': encode_bitmap(position[sku] for sku in run_valid),
+                'rejected': {
+                    reason: {'skus': encode_bitmap(i for i, _ in sorted(entries)), 'values': [value for _, value in sorted(entries)]}
+                    for reason, entries in sorted(by_reason.items())
+                },
+            })
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        # mtime=0: identical ledgers compress to identical bytes
+        with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            f.write(json.dumps({'feed': self.feed_key, 'skus': skus, 'runs': encoded}, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp_path, self.path)
+
+        reasons = {}
+        for reason, _ in rejected.values():
+            reasons[reason] = reasons.get(reason, 0) + 1
+        return {
+            'run_id': runs[-1][0],
+            'runs': len(encoded),
+            'skus': len(skus),
+            'published': len(runs[-1][2]),
+            'valid': len(valid),
+            'rejected': reasons,
+            'bytes': os.path.getsize(self.path),
+        }
+
+    def explain(self, sku):
+        """Outcome of sku in every stored run, newest first: {run_id, generated_at, status, value}"""
+        ledger = self.load()
+        skus = ledger['skus']
+        i = bisect.bisect_left(skus, sku)
+        known = i < len(skus) and skus[i] == sku
+        history = []
+        for run in reversed(ledger['runs']):
+            entry = {'run_id': run['run_id'], 'generated_at': run['generated_at'], 'status': NOT_PROCESSED, 'value': None}
+            if known:
+                if bitmap_test(base64.b64decode(run['published']), i):
+                    entry['status'] = 'published'
+                elif bitmap_test(base64.b64decode(run['valid']), i):
+                    entry['status'] = NOT_PUBLISHED
+                else:
+                    for reason, rejected in run['rejected'].items():
+                        bits = base64.b64decode(rejected['skus'])
+                        if bitmap_test(bits, i):
+                            # Values are stored in SKU order: the rank of the bit is the value index
+                            entry['status'] = reason
+                            entry['value'] = rejected['values'][bitmap_rank(bits, i)]
+                            break
+            history.append(entry)
+        return history
+
+STATUS_TEXT = {
+    'published': 'published',
+    NOT_PUBLISHED: 'valid but not published (not selected, duplicate EAN or no live image)',
+    NOT_PROCESSED: 'not processed (category not sampled or beyond its quota)',
+}
+
+def print_explanation(feed_key, sku, history):
+    if not history:
+        print(f"❓ No runs recorded for {feed_key}")
+        return
+    latest = history[0]
+    streak = 1
+    while streak < len(history) and history[streak]['status'] == latest['status']:
+        streak += 1
+    since = history[streak - 1]
+    status = STATUS_TEXT.get(latest['status'], f"rejected: {latest['status']}")
+    value = f" (value: {latest['value']})" if latest['value'] is not None else ''
+    print(f"🔎 {sku} in {feed_key}: {status}{value}")
+    print(f"   since run {since['run_id']} ({since['generated_at'][:16]}), {streak} of the last {len(history)} run(s)")
+    if latest['status'] != 'published':
+        last_published = next((entry for entry in history if entry['status'] == 'published'), None)
+        if last_published:
+            print(f"   last published: run {last_published['run_id']} ({last_published['generated_at'][:16]})")
+        else:
+            print("   last published: never in the recorded runs")
+    for entry in history:
+        value = f" = {entry['value']}" if entry['value'] is not None else ''
+        print(f"   {entry['generated_at'][:16]}  {entry['run_id']:<20} {entry['status']}{value}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the rejection ledger of a feed')
+    parser.add_argument('command', choices=['explain', 'runs'])
+    parser.add_argument('feed', help='feed key, e.g. kaufland_de or manomano_it')
+    parser.add_argument('sku', nargs='?')
+    parser.add_argument('--cache-dir', default=os.getenv('FEED_CACHE_DIR', '.feed_cache'))
+    args = parser.parse_args()
+    ledger = RejectionLedger(args.cache_dir, args.feed)
+    if args.command == 'runs':
+        for run in reversed(ledger.load()['runs']):
+            rejected = sum(len(entry['values']) for entry in run['rejected'].values())
+            published = sum(1 for _ in bitmap_positions(run['published']))
+            print(f"{run['generated_at'][:16]}  {run['run_id']:<20} published {published:,}, rejected {rejected:,}")
+        return 0
+    if not args.sku:
+        parser.error('explain needs a SKU')
+    print_explanation(args.feed, args.sku, ledger.explain(args.sku))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
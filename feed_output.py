@@ -0,0 +1,123 @@
+import csv
+import os
+
+# Rows buffered per image verification round (one pooled batch of URL checks)
+IMAGE_CHECK_CHUNK = 500
+
+class FeedCsvWriter:
+    """Streams feed rows to a temporary CSV, dropping duplicate EANs, and publishes it atomically"""
+
+    def __init__(self, filename, fieldnames, dedupe_field='ean', keep_fields=None, preview_rows=50, index=None, shards=None,
+                 canonical=False, presorted=False, images=None):
+        self.filename = filename
+        self.tmp_filename = filename + '.tmp'
+        self.fieldnames = fieldnames
+        self.dedupe_field = dedupe_field
+        # With keep_fields, only the first preview_rows rows are kept whole (bounded-memory runs)
+        self.keep_fields = keep_fields
+        self.preview_rows = preview_rows
+        # Optional RowIndex: offer hashes for the change log, published with the CSV
+        self.index = index
+        self.changes = None
+        # Optional ShardedOutput: bounded shard files and manifest, written from the published CSV
+        self.shards = shards
+        self.sharding = None
+        # Canonical output: rows ordered by dedupe_field with fixed float formatting, so
+        # unchanged offers stay byte-identical between runs (presorted rows are written as they come)
+        self.canonical = canonical
+        self.presorted = presorted
+        # Optional ImageVerifier: rows wait in pending until their image URLs are checked
+        self.images = images
+        self.pending = []
+        self.image_check = None
+        self.validation = None
+        self.seen = set()
+        self.rows = []
+        self.duplicates = 0
+        self.file = open(self.tmp_filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, row):
+        """Write a row unless its EAN is empty or already written"""
+        if self.images is not None:
+            if not row.get(self.dedupe_field) or row[self.dedupe_field] in self.seen:
+                self.duplicates += 1
+                return False
+            self.pending.append(row)
+            if len(self.pending) >= IMAGE_CHECK_CHUNK:
+                self._flush_pending()
+            return True
+        return self._accept(row)
+
+    def _flush_pending(self):
+        rows, self.pending = self.pending, []
+        for row in self.images.filter(rows):
+            self._accept(row)
+
+    def flush(self):
+        """Write the rows still waiting for image verification (rows is complete afterwards)"""
+        if self.images is not None:
+            self._flush_pending()
+            self.images.save()
+            self.image_check = self.images.report()
+
+    def _accept(self, row):
+        key = row.get(self.dedupe_field)
+        if not key or key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        if not self.canonical:
+            self.writer.writerow(row)
+        elif self.presorted:
+            self.writer.writerow(self._format(row))
+        if self.index is not None:
+            self.index.add(row)
+        if self.shards is not None:
+            self.shards.assign(row)
+        if self.keep_fields is None or len(self.rows) < self.preview_rows:
+            self.rows.append(row)
+        else:
+            self.rows.append({field: row.get(field) for field in self.keep_fields})
+        return True
+
+    @staticmethod
+    def _format(row):
+        return {field: f"{value:.2f}" if isinstance(value, float) else value for field, value in row.items()}
+
+    def close(self, validate=None):
+        """Publish the CSV; returns False (and publishes nothing) when no row was written.
+
+        validate is called with the temporary file before it replaces the
+        published one; it raises to keep the previous feed in place.
+        """
+        self.flush()
+        if self.canonical and not self.presorted:
+            # Sorted in place: the caller's view of rows (HTML preview, stats) follows the same order
+            self.rows.sort(key=lambda row: row[self.dedupe_field])
+            for row in self.rows:
+                self.writer.writerow(self._format(row))
+        self.file.close()
+        if not self.rows:
+            os.remove(self.tmp_filename)
+            return False
+        if validate is not None:
+            self.validation = validate(self.tmp_filename)
+        os.replace(self.tmp_filename, self.filename)
+        if self.index is not None:
+            self.changes = self.index.publish()
+        if self.shards is not None:
+            self.sharding = self.shards.publish(self.filename, len(self.rows))
+        return True
+
+    def discard(self):
+        """Drop the partial CSV, leaving any previously published feed in place"""
+        self.pending = []
+        if self.images is not None:
+            # Probe results stay valid even when the feed is not published
+            self.images.save()
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.tmp_filename):
+            os.remove(self.tmp_filename)
@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+class Pipeline:
+    """Runs a source and a chain of stages in threads connected by bounded queues.
+
+    Each stage is a function taking one item and returning the item for the
+    next stage (None drops it). Bounded queues give backpressure: a fast
+    stage blocks once the next one falls queue_size items behind, so the
+    wall time approaches the slowest stage instead of the sum of all stages.
+    """
+
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.stop_event = threading.Event()
+        self.error = None
+        self.busy_seconds = {}
+
+    def stop(self):
+        """Stop pulling new items from the source; queued items still drain"""
+        self.stop_event.set()
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def _put(self, q, item):
+        # Every consumer reads until _DONE (even after an error), so a blocking put cannot deadlock
+        if self.error is None or item is _DONE:
+            q.put(item)
+
+    def _run_source(self, source, out_queue):
+        name = 'source'
+        try:
+            iterator = iter(source)
+            while not self.stopped:
+                started = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    self.busy_seconds[name] = self.busy_seconds.get(name, 0.0) + time.monotonic() - started
+                self._put(out_queue, item)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._put(out_queue, _DONE)
+
+    def _run_stage(self, name, stage, in_queue, out_queue):
+        try:
+            while True:
+                item = in_queue.get()
+                if item is _DONE:
+                    break
+                if self.error is not None:
+                    continue
+                started = time.monotonic()
+                result = stage(item)
+                self.busy_seconds[name] = self.busy_seconds.get(name, 0.0) + time.monotonic() - started
+                if out_queue is not None and result is not None:
+                    self._put(out_queue, result)
+        except BaseException as e:
+            self.error = e
+            # Nothing after a failed stage is kept: the source stops fetching
+            self.stop_event.set()
+            # Keep draining so upstream threads are never blocked on a full queue
+            while in_queue.get() is not _DONE:
+                pass
+        finally:
+            if out_queue is not None:
+                self._put(out_queue, _DONE)
+
+    def run(self, source, stages):
+        """Run the pipeline to completion; stages is a list of (name, function) pairs"""
+        started = time.monotonic()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+        threads = [threading.Thread(target=self._run_source, args=(source, queues[0]), daemon=True)]
+        for i, (name, stage) in enumerate(stages):
+            out_queue = queues[i + 1] if i + 1 < len(stages) else None
+            threads.append(threading.Thread(target=self._run_stage, args=(name, stage, queues[i], out_queue), daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        return {
+            'wall_seconds': round(time.monotonic() - started, 2),
+            'busy_seconds': {name: round(seconds, 2) for name, seconds in self.busy_seconds.items()},
+        }
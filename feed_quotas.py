@@ -0,0 +1,138 @@
+import json
+import math
+
+# Pseudo-products backing the prior pass rate, so a taxonomy seen with only a
+# handful of products does not swing its quota to the extremes
+PRIOR_WEIGHT = 50
+DEFAULT_PASS_RATE = 0.5
+# Weight kept by older runs when folding a new run into the history
+HISTORY_DECAY = 0.5
+
+def load_taxonomy_yield(info_filename):
+    """Load per-taxonomy pass-rate history written by the previous run"""
+    try:
+        with open(info_filename, 'r') as f:
+            return json.load(f).get('taxonomy_yield', {})
+    except Exception:
+        return {}
+
+def global_pass_rate(history):
+    """Pass rate over every taxonomy in the history"""
+    processed = sum(entry.get('processed', 0) for entry in history.values())
+    valid = sum(entry.get('valid', 0) for entry in history.values())
+    if processed <= 0:
+        return DEFAULT_PASS_RATE
+    return valid / processed
+
+def estimate_pass_rate(entry, prior_rate):
+    """Smoothed pass rate for one taxonomy"""
+    processed = entry.get('processed', 0) if entry else 0
+    valid = entry.get('valid', 0) if entry else 0
+    return (valid + prior_rate * PRIOR_WEIGHT) / (processed + PRIOR_WEIGHT)
+
+def compute_taxonomy_quotas(taxonomies, history, sample_size, default_quotas, min_quota=25, quota_factor=4):
+    """Compute per-taxonomy fetch quotas that reach sample_size with the fewest fetched products.
+
+    Taxonomies are filled greedily from the highest predicted pass rate down,
+    each bounded by quota_factor x its default cap and by the product count seen
+    in the previous run. Every taxonomy keeps min_quota products so its pass
+    rate stays measured.
+    """
+    prior_rate = global_pass_rate(history)
+    plan = {}
+    for taxonomy in taxonomies:
+        tax_id = str(taxonomy['id'])
+        entry = history.get(tax_id)
+        max_quota = default_quotas[tax_id] * quota_factor
+        if entry and entry.get('available'):
+            max_quota = min(max_quota, entry['available'])
+        plan[tax_id] = {
+            'pass_rate': estimate_pass_rate(entry, prior_rate),
+            'max_quota': max_quota,
+            'quota': min(min_quota, max_quota),
+            'has_history': bool(entry and entry.get('processed')),
+        }
+
+    remaining = sample_size - sum(p['quota'] * p['pass_rate'] for p in plan.values())
+    for tax_id in sorted(plan, key=lambda t: plan[t]['pass_rate'], reverse=True):
+        if remaining <= 0:
+            break
+        p = plan[tax_id]
+        extra = min(p['max_quota'] - p['quota'], math.ceil(remaining / p['pass_rate']))
+        if extra > 0:
+            p['quota'] += extra
+            remaining -= extra * p['pass_rate']
+
+    # Without any history there is nothing to predict from: keep the default caps
+    if not history:
+        for tax_id, p in plan.items():
+            p['quota'] = default_quotas[tax_id]
+
+    for p in plan.values():
+        p['predicted_valid'] = round(p['quota'] * p['pass_rate'], 1)
+    return plan
+
+def new_yield_counters(taxonomies, plan):
+    """Per-taxonomy counters filled in while fetching and validating"""
+    return {
+        str(taxonomy['id']): {
+            'name': taxonomy['name'],
+            'available': 0,
+            'quota': plan[str(taxonomy['id'])]['quota'],
+            'fetched': 0,
+            'processed': 0,
+            'valid': 0,
+            'offers': 0,
+            'fetch_seconds': None,
+        }
+        for taxonomy in taxonomies
+    }
+
+def merge_taxonomy_yield(history, counters):
+    """Fold this run's counters into the persisted history"""
+    merged = dict(history)
+    for tax_id, run in counters.items():
+        if run['processed'] <= 0:
+            continue
+        previous = history.get(tax_id, {})
+        processed = previous.get('processed', 0) * HISTORY_DECAY + run['processed']
+        valid = previous.get('valid', 0) * HISTORY_DECAY + run['valid']
+        merged[tax_id] = {
+            'name': run['name'],
+            'available': run['available'],
+            'processed': round(processed, 1),
+            'valid': round(valid, 1),
+            'pass_rate': round(valid / processed, 4),
+        }
+        # Fetch time (only measured when nothing came from a checkpoint) feeds the time budget
+        fetch_seconds = run.get('fetch_seconds') or previous.get('fetch_seconds')
+        if run.get('fetch_seconds') and previous.get('fetch_seconds'):
+            fetch_seconds = previous['fetch_seconds'] * HISTORY_DECAY + run['fetch_seconds'] * (1 - HISTORY_DECAY)
+        if fetch_seconds:
+            merged[tax_id]['fetch_seconds'] = round(fetch_seconds, 1)
+    return merged
+
+def yield_report(plan, counters):
+    """Predicted vs. actual yield for the info JSON"""
+    per_taxonomy = {}
+    for tax_id, run in counters.items():
+        predicted_rate = plan[tax_id]['pass_rate']
+        per_taxonomy[tax_id] = {
+            'name': run['name'],
+            'quota': run['quota'],
+            'fetched': run['fetched'],
+            'processed': run['processed'],
+            'predicted_pass_rate': round(predicted_rate, 4),
+            'actual_pass_rate': round(run['valid'] / run['processed'], 4) if run['processed'] else None,
+            'predicted_valid': round(run['fetched'] * predicted_rate, 1),
+            'actual_valid': run['valid'],
+            'valid_offers': run['offers'],
+        }
+    return {
+        'fetched': sum(r['fetched'] for r in counters.values()),
+        'processed': sum(r['processed'] for r in counters.values()),
+        'predicted_valid': round(sum(r['predicted_valid'] for r in per_taxonomy.values()), 1),
+        'actual_valid': sum(r['valid'] for r in counters.values()),
+        'valid_offers': sum(r['offers'] for r in counters.values()),
+        'per_taxonomy': per_taxonomy,
+    }
@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+def parse_reset(value):
+    """Parse a rate-limit reset header (epoch timestamp or delta seconds) into seconds"""
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return parse_retry_after(value)
+    # Values that look like a Unix timestamp are absolute, the rest are deltas
+    if reset > 1e9:
+        return max(0.0, reset - time.time())
+    return max(0.0, reset)
+
+def first_header(headers, names):
+    """First present header among names (case-insensitive lookup on requests headers)"""
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+class AdaptiveRateLimiter:
+    """Client-side AIMD rate limiter driven by 429s and rate-limit headers.
+
+    The rate grows additively after every successful (2xx/3xx) response, is
+    left unchanged by errors and connection failures, and is cut
+    multiplicatively on each 429. Retry-After and X-RateLimit-* headers pause
+    requests until the server-side window reopens and cap the rate to the
+    quota the server reports as remaining.
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=10.0, increase=0.1, decrease=0.5):
+        self.rate = initial_rate  # requests per second
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.next_allowed = 0.0
+        # End of the current backoff/quota pause (waits before it count as throttled, plain pacing does not)
+        self.paused_until = 0.0
+        self.requests = 0
+        self.throttled_responses = 0
+        self.throttled_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request is allowed"""
+        with self.lock:
+            now = time.monotonic()
+            wait = max(0.0, self.next_allowed - now)
+            self.next_allowed = max(now, self.next_allowed) + 1.0 / self.rate
+            self.requests += 1
+            self.throttled_seconds += min(wait, max(0.0, self.paused_until - now))
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every request back for the given number of seconds"""
+        with self.lock:
+            until = time.monotonic() + seconds
+            self.next_allowed = max(self.next_allowed, until)
+            self.paused_until = max(self.paused_until, until)
+
+    def on_response(self, status_code, headers):
+        """Adapt the rate to a response; returns seconds to wait before retrying a 429"""
+        remaining = first_header(headers, ['X-RateLimit-Remaining', 'RateLimit-Remaining'])
+        reset = parse_reset(first_header(headers, ['X-RateLimit-Reset', 'RateLimit-Reset']))
+
+        if status_code == 429:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after is None:
+                retry_after = reset if reset is not None else 1.0 / self.rate
+            with self.lock:
+                self.throttled_responses += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.pause(retry_after)
+            return retry_after
+
+        with self.lock:
+            if 200 <= status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            try:
+                remaining = int(remaining) if remaining is not None else None
+            except ValueError:
+                remaining = None
+            if remaining and reset:
+                # Spread what is left of the quota over the rest of the window
+                self.rate = max(self.min_rate, min(self.rate, remaining / reset))
+        if remaining == 0 and reset:
+            # Quota used up: wait for the window to reopen, then carry on at the current rate
+            self.pause(reset)
+        return 0.0
+
+    def stats(self):
+        """Current rate and throttling counters for the run stats"""
+        return {
+            'current_rate': round(self.rate, 3),
+            'requests': self.requests,
+            'throttled_responses': self.throttled_responses,
+            'throttled_seconds': round(self.throttled_seconds, 2),
+        }
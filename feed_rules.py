@@ -0,0 +1,106 @@
+import bisect
+
+# Offer limits per feed (price in EUR on the retail price: wholesale + VAT + margin + base)
+KAUFLAND_LIMITS = {'max_weight': 25.0, 'max_volume': 70000, 'min_price': 6.0, 'max_price': 200.0, 'min_stock': 2}
+MARKETPLACE_RULES = {
+    'kaufland_it': KAUFLAND_LIMITS,
+    'kaufland_de': KAUFLAND_LIMITS,
+    'kaufland_at': KAUFLAND_LIMITS,
+    'kaufland_pl': KAUFLAND_LIMITS,
+    'kaufland_sk': KAUFLAND_LIMITS,
+    'kaufland_cz': KAUFLAND_LIMITS,
+    'manomano_it': {'max_weight': 50.0, 'max_volume': 100000, 'min_price': 6.0, 'max_price': 500.0, 'min_stock': 2},
+}
+
+# Limit name -> (product attribute, comparison, validation_stats reason), in evaluation order
+CHECKS = {
+    'min_stock': ('stock', 'min', 'no_stock'),
+    'max_weight': ('weight', 'max', 'weight_too_high'),
+    'max_volume': ('volume', 'max', 'volume_too_high'),
+    'max_price': ('price', 'max', 'price_too_high'),
+    'min_price': ('price', 'min', 'price_too_low'),
+}
+# validation_stats reason -> product attribute it tests (the offending value in the rejection ledger)
+REASON_ATTRIBUTES = {reason: attribute for attribute, _, reason in CHECKS.values()}
+
+class EligibilityRules:
+    """Every feed's limits compiled into one lookup table per check.
+
+    Feed i owns bit i of the eligibility mask. For each check the distinct
+    limits are sorted and paired with the mask of feeds a value passes, so a
+    product is tested against all feeds with one bisect per check, however
+    many feeds there are.
+    """
+
+    def __init__(self, rule_sets):
+        self.names = list(rule_sets)
+        self.all_mask = (1 << len(self.names)) - 1
+        self.checks = []
+        for limit_name, (attribute, kind, reason) in CHECKS.items():
+            bounded = {name: rules[limit_name] for name, rules in rule_sets.items() if limit_name in rules}
+            if not bounded:
+                continue
+            limits = sorted(set(bounded.values()))
+            bits = [0] * len(limits)
+            for name, limit in bounded.items():
+                bits[limits.index(limit)] |= 1 << self.names.index(name)
+            # masks[i]: feeds passed by a value that bisect places at position i
+            masks = [0] * (len(limits) + 1)
+            if kind == 'max':
+                for i in range(len(limits) - 1, -1, -1):
+                    masks[i] = masks[i + 1] | bits[i]
+            else:
+                for i in range(len(limits)):
+                    masks[i + 1] = masks[i] | bits[i]
+            unbounded = self.all_mask & ~sum(1 << self.names.index(name) for name in bounded)
+            self.checks.append((attribute, kind, reason, limits, masks, unbounded))
+
+    def bit(self, name):
+        return 1 << self.names.index(name)
+
+    def evaluate(self, values, counts=None):
+        """Eligibility mask of one product, plus (reason, rejected mask) for every failed check.
+
+        A feed is only charged with its first failed check; counts (a dict of
+        mask tallies, see report()) is updated when given.
+        """
+        mask = self.all_mask
+        failures = []
+        for attribute, kind, reason, limits, masks, unbounded in self.checks:
+            value = values[attribute]
+            position = bisect.bisect_left(limits, value) if kind == 'max' else bisect.bisect_right(limits, value)
+            rejected = mask & ~(masks[position] | unbounded)
+            if rejected:
+                failures.append((reason, rejected))
+                mask &= ~rejected
+        if counts is not None:
+            key = str(mask)
+            counts[key] = counts.get(key, 0) + 1
+            for reason, rejected in failures:
+                key = f"{reason}:{rejected}"
+                counts[key] = counts.get(key, 0) + 1
+        return mask, failures
+
+    @staticmethod
+    def rejection(failures, bit):
+        """Reason a feed's bit was cleared, or None if the product is eligible"""
+        for reason, rejected in failures:
+            if rejected & bit:
+                return reason
+        return None
+
+    def report(self, counts):
+        """Per-feed eligible and rejection counts from the mask tallies of evaluate()"""
+        report = {name: {'eligible': 0} for name in self.names}
+        for key, count in counts.items():
+            reason, _, mask = key.rpartition(':')
+            mask = int(mask)
+            for i, name in enumerate(self.names):
+                if mask & (1 << i):
+                    entry = report[name]
+                    field = reason or 'eligible'
+                    entry[field] = entry.get(field, 0) + count
+        return report
+
+def compile_rules(rule_sets=None):
+    return EligibilityRules(rule_sets or MARKETPLACE_RULES)
@@ -0,0 +1,67 @@
+import heapq
+import json
+import os
+
+# Stock depth enters the score as quantity ** STOCK_EXPONENT (diminishing returns)
+STOCK_EXPONENT = 0.5
+
+def load_score_config():
+    """Scoring settings from the environment, or None for the random selection.
+
+    Opt-in: FEED_SELECTION=score enables the expected-value selection (the
+    default, random, keeps the shuffled first-sample_size selection);
+    FEED_SCORE_STOCK_EXPONENT and FEED_SCORE_CATEGORY_WEIGHTS (JSON object
+    of taxonomy id -> weight, default 1.0) tune the expected value.
+    """
+    if os.getenv('FEED_SELECTION', 'random').lower() != 'score':
+        return None
+    return {
+        'stock_exponent': float(os.getenv('FEED_SCORE_STOCK_EXPONENT', STOCK_EXPONENT)),
+        'category_weights': {str(k): float(v) for k, v in json.loads(os.getenv('FEED_SCORE_CATEGORY_WEIGHTS', '{}')).items()},
+    }
+
+def offer_score(config, margin_eur, quantity, taxonomy_id):
+    """Expected value of listing an offer: absolute margin x stock depth x category weight"""
+    weight = config['category_weights'].get(str(taxonomy_id), 1.0)
+    return round(margin_eur * quantity ** config['stock_exponent'] * weight, 4)
+
+class TopK:
+    """The k best-scored rows of a stream, in a bounded min-heap (O(n log k), k rows in memory).
+
+    Ties keep the earlier row, so the selection is deterministic for a
+    given product order.
+    """
+
+    def __init__(self, k, score_field='_score'):
+        self.k = k
+        self.score_field = score_field
+        self.heap = []
+        self.seen = 0
+
+    def add(self, row):
+        self.seen += 1
+        # Later rows rank lower on equal scores (-seen)
+        item = (row[self.score_field], -self.seen, row)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def cutoff(self):
+        """Lowest score that made the selection (None while fewer than k rows were seen)"""
+        return self.heap[0][0] if len(self.heap) >= self.k else None
+
+    def rows(self):
+        """Selected rows, best first"""
+        return [item[2] for item in sorted(self.heap, key=lambda item: item[:2], reverse=True)]
+
+    def report(self):
+        scores = [item[0] for item in self.heap]
+        return {
+            'mode': 'score',
+            'candidates': self.seen,
+            'selected': len(self.heap),
+            'score_cutoff': self.cutoff(),
+            'score_max': max(scores) if scores else None,
+            'score_total': round(sum(scores), 2),
+        }
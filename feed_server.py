@@ -0,0 +1,232 @@
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Generated files the server publishes (everything else in the directory is 404)
+SERVED_PATTERNS = (
+    'kaufland_feed*.csv', 'manomano_feed.csv',
+    'index*.html', 'manomano_index.html',
+    'feed_info*.json', 'manomano_feed_info.json',
+    'shards/*/*.csv', 'shards/*/manifest.json',
+)
+CONTENT_TYPES = {
+    '.csv': 'text/csv; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+}
+# Feeds change a few times a day: clients may keep a copy but must revalidate it
+CACHE_CONTROL = 'public, no-cache'
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+WRITE_CHUNK = 1024 * 1024
+# Only the feeds (replaced atomically by FeedCsvWriter) are big enough to map;
+# info JSON and previews are rewritten in place, so they are read into memory
+MMAP_MIN_BYTES = 1024 * 1024
+
+class FeedFile:
+    """One published file with its strong ETag and gzip body.
+
+    Feeds are memory-mapped: the generator replaces them with os.replace(),
+    so the mapping of the old inode stays valid for requests in flight while
+    the new version loads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self.size = stat.st_size
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.mtime = int(stat.st_mtime)
+        with open(path, 'rb') as f:
+            if self.size >= MMAP_MIN_BYTES:
+                self.body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.body = f.read()
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+        self._gzip_body = None
+        self.lock = threading.Lock()
+
+    def gzip_body(self):
+        """Compressed once per file version, on first request"""
+        with self.lock:
+            if self._gzip_body is None:
+                self._gzip_body = gzip.compress(self.body, compresslevel=6, mtime=self.mtime)
+            return self._gzip_body
+
+class FeedStore:
+    """Published files of a directory, reloaded when the file on disk changes"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        if '..' in name or name.startswith('/') or not any(fnmatch.fnmatch(name, pattern) for pattern in SERVED_PATTERNS):
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            current = self.files.get(name)
+            if current is None or current.version != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                current = FeedFile(path)
+                self.files[name] = current
+            return current
+
+def etag_matches(header, etag):
+    """If-None-Match comparison (weak, as RFC 9110 requires for GET)"""
+    if header.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag in candidates
+
+def not_modified_since(header, feed_file):
+    try:
+        return feed_file.mtime <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def accepts_gzip(header):
+    for coding in (header or '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+def parse_range(header, size):
+    """(start, end) of a single byte range, 'unsatisfiable', or None to send the whole body"""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    store = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        name = self.path.split('?', 1)[0].lstrip('/') or 'index.html'
+        feed_file = self.store.get(name)
+        if feed_file is None:
+            self._send_empty(404)
+            return
+
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding')) and 'Range' not in self.headers
+        etag = feed_file.gzip_etag if use_gzip else feed_file.etag
+        if_none_match = self.headers.get('If-None-Match')
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if (if_none_match and etag_matches(if_none_match, etag)) or (
+                not if_none_match and if_modified_since and not_modified_since(if_modified_since, feed_file)):
+            self._send_empty(304, feed_file, etag)
+            return
+
+        body = feed_file.gzip_body() if use_gzip else feed_file.body
+        start, end = 0, len(body) - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if range_header and self._if_range_holds(feed_file):
+            byte_range = parse_range(range_header, len(body))
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                start, end = byte_range
+                status = 206
+
+        self.send_response(status)
+        self._send_validators(feed_file, etag)
+        self.send_header('Content-Type', CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'))
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if send_body:
+            view = memoryview(body)
+            for offset in range(start, end + 1, WRITE_CHUNK):
+                self.wfile.write(view[offset:min(offset + WRITE_CHUNK, end + 1)])
+
+    def _if_range_holds(self, feed_file):
+        """Range applies only to the version the client already has part of"""
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == feed_file.etag
+        return if_range == feed_file.last_modified
+
+    def _send_validators(self, feed_file, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', feed_file.last_modified)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+
+    def _send_empty(self, status, feed_file=None, etag=None):
+        self.send_response(status)
+        if feed_file is not None:
+            self._send_validators(feed_file, etag)
+            self.send_header('Vary', 'Accept-Encoding')
+        if status != 304:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        if os.getenv('FEED_SERVER_LOG'):
+            super().log_message(format, *args)
+
+def start_feed_server(directory='.', host='127.0.0.1', port=8080):
+    """Serve the generated feeds of directory from a background thread"""
+    handler = type('Handler', (FeedRequestHandler,), {'store': FeedStore(directory)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 Serving feeds from {os.path.abspath(directory)} on http://{host}:{port}/")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the generated marketplace feeds over HTTP')
+    parser.add_argument('--directory', default='.')
+    parser.add_argument('--host', default=os.getenv('FEED_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('FEED_SERVER_PORT', '8080')))
+    args = parser.parse_args()
+    server = start_feed_server(args.directory, args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("👋 Stopping feed server")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import zlib
+from datetime import datetime
+
+class ShardedOutput:
+    """Splits a published feed CSV into bounded shards with a manifest.
+
+    Shards are keyed by SKU hash (a power-of-two bucket count, so offers keep
+    their shard while the catalog grows) or by taxonomy, and a shard is split
+    into numbered parts past max_rows rows or max_bytes bytes. Each part
+    carries the CSV header; a part whose content hash matches the previous
+    manifest is left untouched on disk.
+    """
+
+    def __init__(self, directory, fieldnames, key_field, shard_by='sku', max_rows=5000, max_bytes=None):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.fieldnames = fieldnames
+        self.key_field = key_field
+        self.shard_by = shard_by
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        # Offer key -> taxonomy id, recorded as rows are written (taxonomy sharding)
+        self.taxonomies = {}
+
+    def assign(self, row):
+        if self.shard_by == 'taxonomy':
+            self.taxonomies[row[self.key_field]] = row.get('_taxonomy', 'other')
+
+    def _bucket_count(self, rows, size):
+        needed = 1
+        if self.max_rows:
+            needed = max(needed, math.ceil(rows / self.max_rows))
+        if self.max_bytes:
+            needed = max(needed, math.ceil(size / self.max_bytes))
+        return 1 << (needed - 1).bit_length()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return {shard['file']: shard for shard in json.load(f).get('shards', [])}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def _encode(values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue().encode('utf-8')
+
+    def publish(self, csv_path, rows):
+        """Shard the published CSV of rows rows; returns the manifest summary"""
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self._load_manifest()
+        header = self._encode(self.fieldnames)
+        buckets = self._bucket_count(rows, os.path.getsize(csv_path))
+
+        open_parts = {}
+        finished = []
+
+        def close_part(part):
+            part['file'].close()
+            finished.append(part)
+
+        def new_part(base, number):
+            name = f"{base}.csv" if number == 0 else f"{base}-{number}.csv"
+            handle = open(os.path.join(self.directory, name + '.tmp'), 'wb')
+            handle.write(header)
+            digest = hashlib.sha256(header)
+            return {'base': base, 'number': number, 'name': name, 'file': handle, 'digest': digest, 'rows': 0, 'bytes': len(header)}
+
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            key_index = self.fieldnames.index(self.key_field)
+            for values in reader:
+                key = values[key_index]
+                if self.shard_by == 'taxonomy':
+                    base = f"tax-{self.taxonomies.get(key, 'other')}"
+                else:
+                    base = f"sku-{zlib.crc32(key.encode('utf-8')) % buckets:03d}"
+                line = self._encode(values)
+                part = open_parts.get(base)
+                if part is None:
+                    part = open_parts[base] = new_part(base, 0)
+                elif (self.max_rows and part['rows'] >= self.max_rows) or (self.max_bytes and part['bytes'] + len(line) > self.max_bytes):
+                    close_part(part)
+                    part = open_parts[base] = new_part(base, part['number'] + 1)
+                part['file'].write(line)
+                part['digest'].update(line)
+                part['rows'] += 1
+                part['bytes'] += len(line)
+        for part in open_parts.values():
+            close_part(part)
+
+        shards = []
+        rewritten = 0
+        for part in sorted(finished, key=lambda part: part['name']):
+            digest = part['digest'].hexdigest()
+            tmp_path = os.path.join(self.directory, part['name'] + '.tmp')
+            path = os.path.join(self.directory, part['name'])
+            if previous.get(part['name'], {}).get('sha256') == digest and os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+                rewritten += 1
+            shards.append({'file': part['name'], 'rows': part['rows'], 'bytes': part['bytes'], 'sha256': digest})
+
+        current = {shard['file'] for shard in shards}
+        removed = 0
+        for name in previous:
+            if name not in current and os.path.exists(os.path.join(self.directory, name)):
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+
+        manifest = {
+            'generated_at': datetime.now().isoformat(),
+            'feed': os.path.basename(csv_path),
+            'shard_by': self.shard_by,
+            'buckets': buckets if self.shard_by == 'sku' else None,
+            'max_rows': self.max_rows,
+            'max_bytes': self.max_bytes,
+            'rows': rows,
+            'fieldnames': self.fieldnames,
+            'shards': shards,
+        }
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        print(f"🧩 {len(shards)} shard(s) in {self.directory}: {rewritten} rewritten, {len(shards) - rewritten} unchanged, {removed} removed")
+        return {'directory': self.directory, 'shards': len(shards), 'rewritten': rewritten, 'unchanged': len(shards) - rewritten, 'removed': removed}
+
+def sharded_output_from_env(feed_filename, fieldnames, key_field):
+    """ShardedOutput for a feed when FEED_OUTPUT_SHARD_ROWS or FEED_OUTPUT_SHARD_MB is set, else None"""
+    max_rows = int(os.getenv('FEED_OUTPUT_SHARD_ROWS', '0')) or None
+    max_mb = float(os.getenv('FEED_OUTPUT_SHARD_MB', '0')) or None
+    if not max_rows and not max_mb:
+        return None
+    directory = os.path.join(os.getenv('FEED_OUTPUT_SHARD_DIR', 'shards'), os.path.splitext(os.path.basename(feed_filename))[0])
+    return ShardedOutput(
+        directory, fieldnames, key_field,
+        shard_by=os.getenv('FEED_OUTPUT_SHARD_BY', 'sku'),
+        max_rows=max_rows,
+        max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+    )
@@ -0,0 +1,85 @@
+import gzip
+import heapq
+import json
+import os
+import shutil
+
+class SpillBuffer:
+    """Buffers feed rows under a memory budget, spilling sorted runs to disk.
+
+    Rows are kept as serialized NDJSON lines; once their size passes
+    memory_bytes the buffer is sorted by key_field and written as a gzipped
+    run. merged() k-way merges the runs (plus whatever is still in memory)
+    in key order and drops duplicate keys, keeping the first row added.
+    """
+
+    def __init__(self, directory, memory_bytes, key_field='ean'):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.key_field = key_field
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.runs = []
+        self.rows_added = 0
+        self.rows_spilled = 0
+        self.duplicates = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def add(self, row):
+        key = row.get(self.key_field)
+        if not key:
+            self.duplicates += 1
+            return
+        line = json.dumps(row, ensure_ascii=False)
+        # (key, sequence) keeps the first row of a duplicated key in front after sorting
+        self.buffer.append((key, self.rows_added, line))
+        self.buffer_bytes += len(line) + 100
+        self.rows_added += 1
+        if self.buffer_bytes >= self.memory_bytes:
+            self._spill()
+
+    def _spill(self):
+        if not self.buffer:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.buffer.sort()
+        path = os.path.join(self.directory, f"run_{len(self.runs):04d}.ndjson.gz")
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            for key, sequence, line in self.buffer:
+                f.write(f"{sequence}\t{line}\n")
+        print(f"💾 Spilled {len(self.buffer):,} rows ({self.buffer_bytes / 1e6:.1f} MB) to {path}")
+        self.runs.append(path)
+        self.rows_spilled += len(self.buffer)
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def _read_run(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for record in f:
+                sequence, line = record.rstrip('\n').split('\t', 1)
+                row = json.loads(line)
+                yield row[self.key_field], int(sequence), row
+
+    def merged(self):
+        """Yield unique rows in key order"""
+        self.buffer.sort()
+        in_memory = ((key, sequence, json.loads(line)) for key, sequence, line in self.buffer)
+        previous = None
+        for key, sequence, row in heapq.merge(in_memory, *[self._read_run(path) for path in self.runs], key=lambda item: item[:2]):
+            if key == previous:
+                self.duplicates += 1
+                continue
+            previous = key
+            yield row
+
+    def cleanup(self):
+        self.buffer = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self):
+        return {
+            'rows': self.rows_added,
+            'spilled_rows': self.rows_spilled,
+            'runs': len(self.runs),
+            'duplicates': self.duplicates,
+        }
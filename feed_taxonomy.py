@@ -0,0 +1,61 @@
+import json
+import os
+import time
+
+# The taxonomy tree barely changes: refetched once a day
+TREE_TTL_SECONDS = 24 * 60 * 60
+
+class TaxonomyTree:
+    """BigBuy taxonomy tree (every level, linked by parentTaxonomy)"""
+
+    def __init__(self, taxonomies):
+        self.taxonomies = taxonomies
+        self.by_id = {str(taxonomy['id']): taxonomy for taxonomy in taxonomies}
+        self.parents = {taxonomy.get('parentTaxonomy') for taxonomy in taxonomies}
+
+    def path(self, taxonomy):
+        """Names from the taxonomy up to its department (leaf first)"""
+        names = []
+        seen = set()
+        while taxonomy and taxonomy['id'] not in seen:
+            seen.add(taxonomy['id'])
+            names.append(taxonomy.get('name', ''))
+            taxonomy = self.by_id.get(str(taxonomy.get('parentTaxonomy')))
+        return names
+
+    def department(self, taxonomy):
+        """Name of the top-level department a taxonomy belongs to"""
+        return self.path(taxonomy)[-1]
+
+    def leaves(self):
+        """Taxonomies without children: the most specific parentTaxonomy filters"""
+        return [taxonomy for taxonomy in self.taxonomies if taxonomy['id'] not in self.parents]
+
+def load_taxonomy_tree(api, cache_dir, ttl=TREE_TTL_SECONDS):
+    """Taxonomy tree from cache_dir/taxonomy_tree.json, refetched when older than ttl.
+
+    A stale cache is still used when the refetch fails; None when there is
+    neither a cache nor a tree from the API.
+    """
+    path = os.path.join(cache_dir, 'taxonomy_tree.json')
+    cached = None
+    try:
+        with open(path, 'r') as f:
+            cached = json.load(f)
+        if time.time() - cached['fetched_at'] < ttl:
+            return TaxonomyTree(cached['taxonomies'])
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    taxonomies = api.get_all_taxonomies()
+    if not taxonomies:
+        if cached:
+            print("⚠️ Taxonomy tree refetch failed, using the cached tree")
+            return TaxonomyTree(cached['taxonomies'])
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'fetched_at': time.time(), 'taxonomies': taxonomies}, f)
+    os.replace(tmp_path, path)
+    print(f"🌳 Taxonomy tree refreshed: {len(taxonomies):,} taxonomies")
+    return TaxonomyTree(taxonomies)
@@ -0,0 +1,235 @@
+import functools
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+# Markup kept in marketplace descriptions (without attributes); other tags are unwrapped
+ALLOWED_TAGS = {
+    'p', 'br', 'ul', 'ol', 'li', 'b', 'strong', 'i', 'em', 'u',
+    'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+VOID_TAGS = {'br'}
+# Tags dropped together with their content
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'head', 'title', 'svg'}
+# Unwrapped block tags still separate words
+BLOCK_TAGS = {'div', 'section', 'article', 'header', 'footer', 'h1', 'blockquote', 'dl', 'dt', 'dd'}
+# Part of the description cache keys: bumped whenever clean_html output changes
+CLEAN_HTML_VERSION = 2
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+EMPTY_ELEMENT_PATTERN = re.compile(r'<(\w+)>\s*</\1>')
+
+class _Tokenizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth += 1
+        elif self.skip_depth:
+            return
+        elif tag in ALLOWED_TAGS:
+            self.tokens.append(('start', tag))
+        elif tag in BLOCK_TAGS:
+            self.tokens.append(('text', ' '))
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skip_depth and tag in VOID_TAGS:
+            self.tokens.append(('start', tag))
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif self.skip_depth:
+            return
+        elif tag in ALLOWED_TAGS and tag not in VOID_TAGS:
+            self.tokens.append(('end', tag))
+        elif tag in BLOCK_TAGS:
+            self.tokens.append(('text', ' '))
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.tokens.append(('text', data))
+
+@functools.lru_cache(maxsize=4096)
+def _tokenize(text):
+    """Sanitized tokens of a description; cached so every length limit reuses one parse"""
+    parser = _Tokenizer()
+    parser.feed(text)
+    parser.close()
+    tokens = []
+    for kind, value in parser.tokens:
+        if kind == 'text':
+            value = WHITESPACE_PATTERN.sub(' ', value)
+            if tokens and tokens[-1][0] == 'text':
+                value = tokens.pop()[1] + value
+                value = WHITESPACE_PATTERN.sub(' ', value)
+        tokens.append((kind, value))
+    return tuple(tokens)
+
+def _fit_text(text, room, hard_cut=False):
+    """Longest prefix of escaped text within room, cut on a word boundary and never inside an entity.
+
+    A first word longer than room is dropped, or cut at room with hard_cut.
+    """
+    cut = text[:room]
+    if room < len(text) and not text[room].isspace() and ' ' in cut.lstrip():
+        cut = cut.rsplit(' ', 1)[0]
+    elif room < len(text) and not text[room].isspace() and not hard_cut:
+        cut = ''
+    amp = cut.rfind('&')
+    if amp != -1 and ';' not in cut[amp:]:
+        cut = cut[:amp]
+    return cut.rstrip()
+
+def clean_html(text, limit):
+    """Sanitize a description and truncate it to limit characters on tag and word boundaries.
+
+    Only ALLOWED_TAGS survive (without attributes), whitespace is collapsed,
+    tags left open by the cut (or by the source) are closed, and the closing
+    tags count towards the limit.
+    """
+    out = []
+    length = 0
+    stack = []
+    closing = 0
+    has_text = False
+    for kind, value in _tokenize(text or ''):
+        if kind == 'start':
+            piece = f"<{value}>"
+            reserve = 0 if value in VOID_TAGS else len(value) + 3
+            if length + len(piece) + closing + reserve > limit:
+                break
+            out.append(piece)
+            length += len(piece)
+            if value not in VOID_TAGS:
+                stack.append(value)
+                closing += reserve
+        elif kind == 'end':
+            if value not in stack:
+                continue
+            while stack:
+                tag = stack.pop()
+                closing -= len(tag) + 3
+                out.append(f"</{tag}>")
+                length += len(tag) + 3
+                if tag == value:
+                    break
+        else:
+            escaped = html.escape(value, quote=False)
+            if not out:
+                escaped = escaped.lstrip()
+            room = limit - length - closing
+            if len(escaped) <= room:
+                out.append(escaped)
+                length += len(escaped)
+                has_text = has_text or bool(escaped.strip())
+                continue
+            # A description that is one overlong word is cut inside it rather than left empty
+            out.append(_fit_text(escaped, room, hard_cut=not has_text))
+            break
+    while stack:
+        out.append(f"</{stack.pop()}>")
+    result = ''.join(out)
+    # Drop elements the cut left empty ("<ul><li></li></ul>")
+    while True:
+        shorter = EMPTY_ELEMENT_PATTERN.sub('', result)
+        if shorter == result:
+            return result.strip()
+        result = shorter
+
+class DescriptionCache:
+    """clean_html results memoized by (content hash, limit), persisted between runs.
+
+    Only entries used by the current run are saved, so the file tracks the
+    live catalog instead of growing forever.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+        self.used = {}
+        # Entries first used since the last drain() (worker processes send them back)
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ Unreadable description cache, starting empty: {e}")
+            return {}
+
+    def get(self, text, limit):
+        key = f"{hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()}:{limit}:{CLEAN_HTML_VERSION}"
+        result = self.used.get(key)
+        if result is None:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                result = clean_html(text, limit)
+            else:
+                self.hits += 1
+            self.used[key] = result
+            self.pending[key] = result
+        else:
+            self.hits += 1
+        return result
+
+    def drain(self):
+        """Entries and counters accumulated since the last drain"""
+        update = {'entries': self.pending, 'hits': self.hits, 'misses': self.misses}
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        return update
+
+    def merge(self, update):
+        """Fold a worker's drain() into this cache"""
+        self.used.update(update['entries'])
+        self.hits += update['hits']
+        self.misses += update['misses']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(self.used, f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.used)}
+
+_cache = None
+
+def load_description_cache(cache_dir, feed_key):
+    """Enable the persistent cache for truncate_description in this process (and forked workers)"""
+    global _cache
+    _cache = DescriptionCache(os.path.join(cache_dir, f"descriptions_{feed_key}.json.gz"))
+    return _cache
+
+def truncate_description(text, limit):
+    """Sanitized description of at most limit characters (cached when a cache is loaded)"""
+    if not text:
+        return ''
+    if _cache is None:
+        return clean_html(text, limit)
+    return _cache.get(text, limit)
+
+def drain_description_cache():
+    """New cache entries of this (worker) process, for merge_description_cache in the parent"""
+    return _cache.drain() if _cache is not None else None
+
+def merge_description_cache(update):
+    if _cache is not None and update:
+        _cache.merge(update)
@@ -0,0 +1,231 @@
+import argparse
+import csv
+import hashlib
+import re
+import sys
+import time
+
+# Currency each Kaufland storefront locale must be priced in
+LOCALE_CURRENCIES = {
+    'de-DE': 'EUR',
+    'de-AT': 'EUR',
+    'it-IT': 'EUR',
+    'sk-SK': 'EUR',
+    'pl-PL': 'PLN',
+    'cs-CZ': 'CZK',
+}
+
+URL_PATTERN = re.compile(r'https?://[^\s/?#]+\.[^\s/?#]+(?:[/?#]\S*)?$')
+# A '<' never closed by '>' (e.g. a description cut inside "<ul><")
+TRUNCATED_TAG_PATTERN = re.compile(r'<[^>]*$')
+
+def _text(max_length=None, required=True):
+    return {'type': 'text', 'max_length': max_length, 'required': required}
+
+def _html(max_length):
+    return {'type': 'html', 'max_length': max_length, 'required': False}
+
+def _number(minimum=0.0, maximum=None, integer=False):
+    return {'type': 'int' if integer else 'float', 'min': minimum, 'max': maximum, 'required': True}
+
+def _url(required=False):
+    return {'type': 'url', 'required': required}
+
+def _choice(*choices):
+    return {'type': 'choice', 'choices': set(choices), 'required': True}
+
+SCHEMAS = {
+    'kaufland': {
+        'columns': {
+            'id_offer': _text(50),
+            'ean': {'type': 'ean', 'required': True},
+            'locale': _choice(*LOCALE_CURRENCIES),
+            'category': _text(),
+            'title': _text(100),
+            'short_description': _html(150),
+            'description': _html(500),
+            'manufacturer': _text(),
+            'picture_1': _url(),
+            'picture_2': _url(),
+            'picture_3': _url(),
+            'picture_4': _url(),
+            'price_cs': _number(minimum=0.01),
+            'quantity': _number(minimum=1, integer=True),
+            'condition': _choice('NEW'),
+            'length': _number(),
+            'width': _number(),
+            'height': _number(),
+            'weight': _number(),
+            'content_volume': _number(),
+            'currency': _choice(*set(LOCALE_CURRENCIES.values())),
+            'handling_time': _number(integer=True),
+            'delivery_time_max': _number(integer=True),
+            'delivery_time_min': _number(integer=True),
+        },
+        'unique': ['id_offer', 'ean'],
+    },
+    'manomano': {
+        'columns': {
+            'sku': _text(50),
+            'ean': {'type': 'ean', 'required': True},
+            'title': _text(100),
+            'description': _html(2000),
+            'brand': _text(),
+            'category': _text(),
+            'price': _number(minimum=0.01),
+            'quantity': _number(minimum=1, integer=True),
+            'condition': _text(),
+            'weight': _number(),
+            'length': _number(),
+            'width': _number(),
+            'height': _number(),
+            'image_url': _url(),
+            'image_url_2': _url(),
+            'image_url_3': _url(),
+            'image_url_4': _url(),
+            'shipping_cost': _number(),
+            'delivery_time': _text(),
+            'warranty': _text(),
+            'origin_country': _text(),
+            'material': _text(required=False),
+            'color': _text(required=False),
+            'size': _text(required=False),
+        },
+        'unique': ['sku', 'ean'],
+    },
+}
+
+# Issues that do not block publishing: a malformed image URL costs the marketplace
+# that picture, not the offer (descriptions are truncated on tag boundaries, so a
+# cut tag is still an error)
+WARNING_CHECKS = {'invalid_url'}
+
+class FeedValidationError(Exception):
+    pass
+
+def valid_ean13(value):
+    """13 digits with a correct GS1 check digit"""
+    if len(value) != 13 or not value.isdigit():
+        return False
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(value[:12]))
+    return (10 - total % 10) % 10 == int(value[12])
+
+def _fingerprint(value):
+    # 64-bit digest: a compact stand-in for the value in the uniqueness sets
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def _check_value(spec, value):
+    """Name of the failed check for one cell, or None"""
+    if value == '':
+        return 'missing_value' if spec['required'] else None
+    kind = spec['type']
+    if kind == 'ean':
+        return None if valid_ean13(value) else 'invalid_ean'
+    if kind in ('int', 'float'):
+        try:
+            number = int(value) if kind == 'int' else float(value)
+        except ValueError:
+            return f"not_{kind}"
+        if number != number or number < spec['min'] or (spec['max'] is not None and number > spec['max']):
+            return 'out_of_range'
+        return None
+    if kind == 'url':
+        return None if URL_PATTERN.match(value) else 'invalid_url'
+    if kind == 'choice':
+        return None if value in spec['choices'] else 'invalid_choice'
+    if spec['max_length'] is not None and len(value) > spec['max_length']:
+        return 'too_long'
+    if kind == 'html' and TRUNCATED_TAG_PATTERN.search(value):
+        return 'truncated_html'
+    return None
+
+def validate_feed(path, schema_name, locale=None, max_examples=20):
+    """Stream a feed CSV through its schema; memory stays constant apart from the uniqueness sets"""
+    schema = SCHEMAS[schema_name]
+    columns = list(schema['columns'])
+    started = time.monotonic()
+    report = {'file': path, 'schema': schema_name, 'rows': 0, 'errors': 0, 'warnings': 0, 'issues': {}, 'examples': []}
+
+    def issue(line, column, check, value):
+        report['warnings' if check in WARNING_CHECKS else 'errors'] += 1
+        report['issues'][check] = report['issues'].get(check, 0) + 1
+        if len(report['examples']) < max_examples:
+            # The end of a truncated cell is the interesting part
+            shown = value[-80:] if check == 'truncated_html' else value[:80]
+            report['examples'].append({'line': line, 'column': column, 'check': check, 'value': shown})
+
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header != columns:
+            issue(1, None, 'header_mismatch', ','.join(header or []))
+            report['seconds'] = round(time.monotonic() - started, 2)
+            return report
+
+        checks = [(i, column, schema['columns'][column]) for i, column in enumerate(columns)]
+        unique = [(columns.index(column), column, set()) for column in schema['unique']]
+        locale_index = columns.index('locale') if 'locale' in columns else None
+        currency_index = columns.index('currency') if 'currency' in columns else None
+        delivery = (columns.index('delivery_time_min'), columns.index('delivery_time_max')) if 'delivery_time_min' in columns else None
+
+        for line, row in enumerate(reader, start=2):
+            report['rows'] += 1
+            if len(row) != len(columns):
+                issue(line, None, 'column_count', ','.join(row))
+                continue
+            for i, column, spec in checks:
+                check = _check_value(spec, row[i])
+                if check:
+                    issue(line, column, check, row[i])
+            for i, column, seen in unique:
+                if row[i]:
+                    fingerprint = _fingerprint(row[i])
+                    if fingerprint in seen:
+                        issue(line, column, 'duplicate', row[i])
+                    seen.add(fingerprint)
+            if locale_index is not None:
+                row_locale = row[locale_index]
+                if locale and row_locale != locale:
+                    issue(line, 'locale', 'unexpected_locale', row_locale)
+                if currency_index is not None and LOCALE_CURRENCIES.get(row_locale, row[currency_index]) != row[currency_index]:
+                    issue(line, 'currency', 'currency_mismatch', f"{row_locale}/{row[currency_index]}")
+            if delivery and row[delivery[0]].isdigit() and row[delivery[1]].isdigit() and int(row[delivery[0]]) > int(row[delivery[1]]):
+                issue(line, 'delivery_time_min', 'out_of_range', row[delivery[0]])
+
+    if report['rows'] == 0:
+        issue(1, None, 'no_rows', '')
+    report['seconds'] = round(time.monotonic() - started, 2)
+    return report
+
+def print_report(report):
+    status = '✅' if not report['errors'] else '❌'
+    print(f"{status} Feed validation ({report['schema']}): {report['rows']:,} rows, {report['errors']:,} errors, {report['warnings']:,} warnings in {report['seconds']}s")
+    for check, count in sorted(report['issues'].items(), key=lambda item: -item[1]):
+        print(f"   {'⚠️' if check in WARNING_CHECKS else '❌'} {check}: {count:,}")
+    for example in report['examples'][:5]:
+        print(f"      line {example['line']} {example['column'] or ''}: {example['value']!r}")
+
+def check_feed(path, schema_name, locale=None):
+    """Validate a feed before it is published; raises FeedValidationError on any error"""
+    report = validate_feed(path, schema_name, locale=locale)
+    print_report(report)
+    if report['errors']:
+        raise FeedValidationError(f"{report['errors']} errors in {path}")
+    return {key: report[key] for key in ('rows', 'errors', 'warnings', 'issues', 'seconds')}
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate a generated marketplace feed CSV')
+    parser.add_argument('schema', choices=sorted(SCHEMAS))
+    parser.add_argument('csv_file')
+    parser.add_argument('--locale', help='expected locale of every row (Kaufland)')
+    args = parser.parse_args()
+    try:
+        report = validate_feed(args.csv_file, args.schema, locale=args.locale)
+    except FileNotFoundError:
+        print(f"❌ Missing {args.csv_file}")
+        return 1
+    print_report(report)
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import os
+
+# Attribute group names (lowercase, feed languages) filling the attribute columns of a feed
+ATTRIBUTE_COLUMNS = {
+    'color': ('color', 'colour', 'colore', 'farbe', 'kolor', 'farba', 'barva'),
+    'size': ('size', 'taglia', 'misura', 'größe', 'groesse', 'rozmiar', 'veľkosť', 'velikost'),
+    'material': ('material', 'materiale', 'materiał', 'materiál'),
+}
+
+def attribute_names(attributes, groups):
+    """Attribute id -> (group name, value name) from the localized attributes and attribute groups payloads"""
+    group_names = {group['id']: group.get('name', '') for group in groups or []}
+    return {
+        str(attribute['id']): (group_names.get(attribute.get('attributeGroup'), ''), attribute.get('name', ''))
+        for attribute in attributes or []
+    }
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def product_offers(product, batch, names):
+    """Offer records of a product: itself, or one per variation when names (attribute names) is given.
+
+    A variation offer is the parent record overlaid with the variation's
+    SKU, EAN, price, extra weight and dimensions, its own stock and its
+    attribute names; parent_sku points back to the parent's info. Every
+    lookup is a dict access into the joined batch, so expanding a batch
+    is linear in its products and variations.
+    """
+    variations = batch['variations'].get(product.get('id')) if names is not None else None
+    if not variations:
+        return [product]
+    variation_stock = batch['stock_data']['variations']
+    offers = []
+    for variation in variations:
+        sku = variation.get('sku')
+        offer = dict(product)
+        offer.update({
+            'sku': sku,
+            'ean13': variation.get('ean13'),
+            'wholesalePrice': variation.get('wholesalePrice') or product.get('wholesalePrice'),
+            'weight': round(_number(product.get('weight')) + _number(variation.get('extraWeight')), 3),
+            'parent_sku': product.get('sku'),
+            'stock': variation_stock.get(sku, 0),
+            'variation_attributes': [names[str(attribute['id'])] for attribute in variation.get('attributes') or []
+                           if str(attribute.get('id')) in names],
+        })
+        for field in ('width', 'height', 'depth'):
+            if _number(variation.get(field)) > 0:
+                offer[field] = variation[field]
+        offers.append(offer)
+    return offers
+
+def variation_title(name, attributes, limit):
+    """Localized product name with the variation's attribute values appended, within limit characters"""
+    suffix = ' - '.join(value for _, value in attributes if value)
+    if not suffix:
+        return name[:limit]
+    suffix = ' - ' + suffix
+    return name[:max(0, limit - len(suffix))].rstrip() + suffix
+
+def attribute_columns(attributes):
+    """Feed attribute columns (color, size, material) found among a variation's attributes"""
+    columns = {}
+    for group, value in attributes:
+        group = group.lower()
+        for column, group_names in ATTRIBUTE_COLUMNS.items():
+            if column not in columns and any(group_name in group for group_name in group_names):
+                columns[column] = value
+    return columns
+
+def variation_names_from_env(api, checkpoint, language):
+    """Attribute names for variation offers (opt-in, FEED_VARIATION_OFFERS=1), or None for parent offers with summed stock.
+
+    The localized attributes are checkpointed like a taxonomy unit; when
+    they cannot be fetched variations are still offered, with the parent's title.
+    """
+    if os.getenv('FEED_VARIATION_OFFERS', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    
+    def fetch():
+        attributes = api.get_attributes(language)
+        if attributes is None:
+            return None
+        return attribute_names(attributes, api.get_attribute_groups(language))
+    
+    return checkpoint.fetch('catalog', 'attributes', fetch) or {}
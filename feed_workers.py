@@ -0,0 +1,70 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from feed_text import merge_description_cache
+
+def sku_shard(sku, shards):
+    """Stable shard number for a SKU (independent of PYTHONHASHSEED)"""
+    return zlib.crc32(str(sku).encode('utf-8')) % shards
+
+def split_batch_by_sku(batch, shards):
+    """Split joined validation lookups into shards by SKU hash.
+
+    Each shard only carries the info, images, variations and stock entries
+    its own products need, so little more than the shard itself is pickled
+    to the worker.
+    """
+    parts = [
+        {
+            'products': [],
+            'product_taxonomy': {},
+            'variations': {},
+            'stock_data': {'products': {}, 'variations': {}},
+            'info': {},
+            'images': {},
+        }
+        for _ in range(shards)
+    ]
+    for product in batch['products']:
+        product_id = product.get('id')
+        sku = product.get('sku')
+        part = parts[sku_shard(sku, shards)]
+        part['products'].append(product)
+        part['product_taxonomy'][product_id] = batch['product_taxonomy'][product_id]
+        if sku in batch['stock_data']['products']:
+            part['stock_data']['products'][sku] = batch['stock_data']['products'][sku]
+        if sku in batch['info']:
+            part['info'][sku] = batch['info'][sku]
+        if product_id in batch['images']:
+            part['images'][product_id] = batch['images'][product_id]
+        if product_id in batch['variations']:
+            part['variations'][product_id] = batch['variations'][product_id]
+            for variation in batch['variations'][product_id]:
+                var_sku = variation.get('sku')
+                if var_sku in batch['stock_data']['variations']:
+                    part['stock_data']['variations'][var_sku] = batch['stock_data']['variations'][var_sku]
+    return [part for part in parts if part['products']]
+
+def new_worker_pool(workers):
+    """Process pool for validation and row rendering"""
+    return ProcessPoolExecutor(max_workers=workers)
+
+def merge_shard_result(result, validation_stats, yield_counters):
+    """Fold one worker result into the run totals and return its rows"""
+    rows, shard_stats, shard_counters, cache_update = result
+    merge_description_cache(cache_update)
+    for key, value in shard_stats.items():
+        if isinstance(value, dict):
+            # Tallies keyed by eligibility mask
+            totals = validation_stats.setdefault(key, {})
+            for tally, count in value.items():
+                totals[tally] = totals.get(tally, 0) + count
+        elif isinstance(value, list):
+            # Offer outcomes for the rejection ledger
+            validation_stats.setdefault(key, []).extend(value)
+        else:
+            validation_stats[key] = validation_stats.get(key, 0) + value
+    for tax_id, counts in shard_counters.items():
+        yield_counters[tax_id]['processed'] += counts['processed']
+        yield_counters[tax_id]['valid'] += counts['valid']
+        yield_counters[tax_id]['offers'] += counts['offers']
+    return rows
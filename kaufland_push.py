@@ -0,0 +1,262 @@
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from feed_ratelimit import AdaptiveRateLimiter
+
+KAUFLAND_API_URL = 'https://sellerapi.kaufland.com/v2'
+# Kaufland storefront of each feed country
+STOREFRONTS = {'IT': 'it', 'DE': 'de', 'AT': 'at', 'PL': 'pl', 'SK': 'sk', 'CZ': 'cz'}
+# Unit listings (id_offer -> id_unit) are refetched at most once a day unless an offer is missing
+UNIT_MAP_TTL_SECONDS = 24 * 60 * 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class KauflandSellerAPI:
+    """Signed Kaufland Seller API client with pooled connections, rate limiting and retries"""
+
+    def __init__(self, client_key, secret_key, storefront, base_url=None, concurrency=4):
+        self.client_key = client_key
+        self.secret_key = secret_key.encode('utf-8')
+        self.storefront = storefront
+        self.base_url = (base_url or KAUFLAND_API_URL).rstrip('/')
+        self.session = requests.Session()
+        # One pooled connection per worker thread
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.rate_limiter = AdaptiveRateLimiter(initial_rate=5.0, max_rate=20.0)
+        self.max_retries = 4
+
+    def _signature(self, method, url, body, timestamp):
+        message = '\n'.join([method, url, body, str(timestamp)])
+        return hmac.new(self.secret_key, message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def request(self, method, path, params=None, payload=None):
+        """(status code, JSON body or error text); retries 429, 5xx and connection errors"""
+        url = requests.Request(method, f"{self.base_url}{path}", params=params).prepare().url
+        body = json.dumps(payload) if payload is not None else ''
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            timestamp = int(time.time())
+            headers = {
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'User-Agent': 'PopPulseEmporium-feed',
+                'Shop-Client-Key': self.client_key,
+                'Shop-Timestamp': str(timestamp),
+                'Shop-Signature': self._signature(method, url, body, timestamp),
+            }
+            try:
+                response = self.session.request(method, url, data=body or None, headers=headers, timeout=30)
+            except requests.RequestException as e:
+                status, result, retry_after = None, str(e), 2 ** attempt
+            else:
+                retry_after = self.rate_limiter.on_response(response.status_code, response.headers) or 2 ** attempt
+                status = response.status_code
+                try:
+                    result = response.json() if response.content else None
+                except ValueError:
+                    result = response.text[:200]
+                if status not in RETRY_STATUSES:
+                    return status, result
+            if attempt < self.max_retries:
+                time.sleep(retry_after)
+        return status, result
+
+    def list_units(self, page_size=100):
+        """id_offer -> id_unit of every unit listed on the storefront"""
+        units = {}
+        offset = 0
+        while True:
+            status, result = self.request('GET', '/units/', params={'storefront': self.storefront, 'limit': page_size, 'offset': offset})
+            if status != 200:
+                raise RuntimeError(f"Unit listing failed with {status}: {result}")
+            page = result.get('data', [])
+            for unit in page:
+                if unit.get('id_offer'):
+                    units[str(unit['id_offer'])] = unit['id_unit']
+            if len(page) < page_size:
+                return units
+            offset += page_size
+
+    def update_unit(self, id_unit, update):
+        return self.request('PATCH', f"/units/{id_unit}", params={'storefront': self.storefront}, payload=update)
+
+class UnitMap:
+    """id_offer -> id_unit of a storefront, cached in the cache directory"""
+
+    def __init__(self, api, cache_dir, feed_key):
+        self.api = api
+        self.path = os.path.join(cache_dir, f"kaufland_units_{feed_key}.json")
+        self.units, self.fetched_at = self._load()
+        self.refreshed = False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data['units'], data['fetched_at']
+        except (FileNotFoundError, ValueError, KeyError):
+            return {}, 0
+
+    def refresh(self):
+        self.units = self.api.list_units()
+        self.fetched_at = time.time()
+        self.refreshed = True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'fetched_at': self.fetched_at, 'units': self.units}, f)
+
+    def resolve(self, offers, gone=()):
+        """id_unit of each offer (None when the offer is not listed).
+
+        The listing is refetched at most once per push: when stale, or when
+        an offer to update is missing. Offers in gone (removed from the feed)
+        that are not in the map are already off the storefront.
+        """
+        missing = any(offer not in self.units for offer in offers if offer not in gone)
+        if not self.refreshed and (time.time() - self.fetched_at > UNIT_MAP_TTL_SECONDS or missing):
+            self.refresh()
+        return {offer: self.units.get(offer) for offer in offers}
+
+def load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def is_removal(update):
+    """A removed offer's update: zero stock and nothing else"""
+    return update == {'amount': 0}
+
+def collect_updates(changes):
+    """Unit updates from a change log: price and quantity changes, removed offers go to zero stock"""
+    updates = {}
+    for change in changes.get('price_changed', []):
+        updates.setdefault(change['key'], {})['listing_price'] = int(round(float(change['new']) * 100))
+    for change in changes.get('quantity_changed', []):
+        updates.setdefault(change['key'], {})['amount'] = int(change['new'])
+    for key in changes.get('removed', []):
+        updates[key] = {'amount': 0}
+    return updates
+
+def push_changes(country, state_dir='feed_state', cache_dir='.feed_cache', checkpoint_every=100, concurrency=4, base_url=None):
+    """Push the price/quantity delta of a Kaufland feed's last run; returns the push report.
+
+    Each unit is one PATCH, sent concurrently over pooled connections (the
+    Seller API has no bulk unit update: its import files must be hosted at
+    a public URL and are processed asynchronously, without per-offer
+    results). Failed updates are kept in <feed_key>.push_pending.json,
+    rewritten every checkpoint_every units, and retried (unless superseded
+    by a newer change) on the next push; an unexpected error while sending
+    keeps every update not sent yet there instead of failing the run.
+    """
+    client_key = os.getenv('KAUFLAND_CLIENT_KEY')
+    secret_key = os.getenv('KAUFLAND_SECRET_KEY')
+    if not client_key or not secret_key:
+        print("⏭️ Kaufland push skipped: KAUFLAND_CLIENT_KEY / KAUFLAND_SECRET_KEY not set")
+        return None
+
+    feed_key = f"kaufland_{country.lower()}"
+    changes_path = os.path.join(state_dir, f"{feed_key}.changes.json")
+    pending_path = os.path.join(state_dir, f"{feed_key}.push_pending.json")
+    report_path = os.path.join(state_dir, f"{feed_key}.push.json")
+    changes = load_json(changes_path, {})
+    previous_report = load_json(report_path, {})
+
+    # Failed updates of earlier pushes first, newer changes override them
+    updates = load_json(pending_path, {})
+    if changes.get('generated_at') and changes['generated_at'] != previous_report.get('changes_generated_at'):
+        updates.update(collect_updates(changes))
+    print(f"📤 Kaufland push ({STOREFRONTS[country]}): {len(updates):,} unit updates")
+
+    started = time.monotonic()
+    api = KauflandSellerAPI(client_key, secret_key, STOREFRONTS[country], base_url or os.getenv('KAUFLAND_API_URL'), concurrency)
+    report = {
+        'pushed_at': datetime.now().isoformat(),
+        'changes_generated_at': changes.get('generated_at'),
+        'updates': len(updates),
+        'succeeded': 0,
+        'failed': 0,
+        'not_listed': 0,
+        'already_gone': 0,
+        'checkpoints': 0,
+        'errors': {},
+    }
+    pending = {}
+    if updates:
+        try:
+            gone = {offer for offer, update in updates.items() if is_removal(update)}
+            id_units = UnitMap(api, cache_dir, feed_key).resolve(list(updates), gone)
+        except Exception as e:
+            # Nothing was sent: every update waits for the next push
+            print(f"❌ Kaufland unit listing failed: {e}")
+            id_units = {offer: None for offer in updates}
+            pending = dict(updates)
+            report['errors']['unit_listing'] = str(e)
+        listed = [(offer, id_units[offer]) for offer in updates if id_units[offer]]
+        unlisted = [offer for offer in updates if not id_units[offer] and offer not in pending]
+        report['already_gone'] = sum(1 for offer in unlisted if is_removal(updates[offer]))
+        report['not_listed'] = len(unlisted) - report['already_gone']
+        sent = set()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for start in range(0, len(listed), checkpoint_every):
+                    chunk = listed[start:start + checkpoint_every]
+                    results = pool.map(lambda item: api.update_unit(item[1], updates[item[0]]), chunk)
+                    for (offer, _), (status, result) in zip(chunk, results):
+                        sent.add(offer)
+                        if status is not None and 200 <= status < 300:
+                            report['succeeded'] += 1
+                            continue
+                        report['failed'] += 1
+                        report['errors'][str(status)] = report['errors'].get(str(status), 0) + 1
+                        # Client errors other than 429 would fail again: keep only retryable updates
+                        if status is None or status in RETRY_STATUSES:
+                            pending[offer] = updates[offer]
+                    report['checkpoints'] += 1
+                    # Progress survives an interrupted push
+                    write_json(pending_path, {**pending, **{offer: updates[offer] for offer, _ in listed[start + checkpoint_every:]}})
+        except Exception as e:
+            # Updates not sent yet wait for the next push; the error goes in the report instead of failing the run
+            print(f"❌ Kaufland push interrupted: {e}")
+            report['errors']['unhandled'] = str(e)
+            pending.update({offer: updates[offer] for offer, _ in listed if offer not in sent})
+    write_json(pending_path, pending)
+    report['pending'] = len(pending)
+    report['seconds'] = round(time.monotonic() - started, 1)
+    report['rate_limit'] = api.rate_limiter.stats()
+    write_json(report_path, report)
+    print(f"✅ Pushed {report['succeeded']:,}, failed {report['failed']:,} ({report['pending']:,} pending retry), not listed {report['not_listed']:,} ({report['already_gone']:,} removed offers already gone) in {report['seconds']}s")
+    return report
+
+def main():
+    country = (sys.argv[1] if len(sys.argv) > 1 else os.getenv('COUNTRY_CODE', 'IT')).upper()
+    if country not in STOREFRONTS:
+        print(f"❌ Unsupported country: {country}")
+        return 1
+    push_changes(
+        country,
+        state_dir=os.getenv('FEED_STATE_DIR', 'feed_state'),
+        cache_dir=os.getenv('FEED_CACHE_DIR', '.feed_cache'),
+        checkpoint_every=int(os.getenv('KAUFLAND_PUSH_CHECKPOINT', '100')),
+        concurrency=int(os.getenv('KAUFLAND_PUSH_CONCURRENCY', '4')),
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())